@@ -0,0 +1,54 @@
+"""
+Backfill precomputed Share B alignment features for tickets created before
+the share_b_features column existed.
+
+Run:
+  uv run python backfill_features.py [--batch-size 200] [--recompute]
+
+--recompute rewrites every ticket's features, e.g. to shrink blobs stored
+before ALIGNMENT_STORED_KEYPOINTS capped them.
+"""
+
+import argparse
+import io
+
+from PIL import Image
+
+import models
+from core_crypto import compute_alignment_features
+from database import get_session
+
+
+def backfill_features(batch_size: int = 200, recompute: bool = False) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        with get_session() as session:
+            query = session.query(models.Ticket).filter(models.Ticket.id > last_id)
+            if not recompute:
+                query = query.filter(models.Ticket.share_b_features.is_(None))
+            tickets = (
+                query
+                .order_by(models.Ticket.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not tickets:
+                break
+            for ticket in tickets:
+                share_b_img = Image.open(io.BytesIO(ticket.share_b_blob))
+                ticket.share_b_features = compute_alignment_features(share_b_img)
+            session.commit()
+            updated += len(tickets)
+            last_id = tickets[-1].id
+        print(f"Backfilled {updated} tickets...")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--recompute", action="store_true", help="rewrite features that are already set")
+    args = parser.parse_args()
+    total = backfill_features(args.batch_size, args.recompute)
+    print(f"Backfill complete ({total} tickets).")
@@ -0,0 +1,146 @@
+"""
+Measure peak memory and decode time of the verify image path across upload
+sizes, with and without reduced-resolution decoding.
+
+Run:
+  uv run python bench_ingest.py [--scales 1 2 4 6] [--iterations 3]
+
+One compact ticket is rendered; its labelled Share A is uploaded as-is
+(canonical PNG) and as "photos": scaled up by each integer factor (so the
+share's subpixel grid survives) and saved as color JPEG (quality 90).
+Every (upload, REDUCED_DECODE) pair runs in a fresh process so ru_maxrss
+only reflects that verify: the child imports and warms up, records its
+baseline RSS, then runs code extraction + stack/decode.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+def _child(share_a_path: str, share_b_path: str, expected_path: str, iterations: int) -> None:
+    from core_crypto import CODE_LABEL_TARGET_SIDE, extract_check_in_code, stack_and_decode, warm_up
+    from image_decode import reduction_factor, sniff_image
+
+    with open(share_a_path, "rb") as f:
+        share_a = f.read()
+    with open(share_b_path, "rb") as f:
+        share_b = f.read()
+    with open(expected_path, "r", encoding="utf-8") as f:
+        expected_code, expected_payload = f.read().split("\n", 1)
+
+    warm_up()
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings, code_ok, decoded_ok = [], 0, 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        code = extract_check_in_code(share_a)
+        decoded, _, _ = stack_and_decode(share_a, share_b)
+        timings.append((time.perf_counter() - started) * 1000)
+        code_ok += code == expected_code
+        decoded_ok += decoded == expected_payload
+
+    print(
+        json.dumps(
+            {
+                "baseline_kb": baseline_kb,
+                "peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "ms": statistics.median(timings),
+                "code": f"{code_ok}/{iterations}",
+                "decoded": f"{decoded_ok}/{iterations}",
+                "stack_factor": reduction_factor(share_a, max(sniff_image(share_b)[1:])),
+                "label_factor": reduction_factor(share_a, CODE_LABEL_TARGET_SIDE),
+            }
+        )
+    )
+
+
+def _make_uploads(workdir: str, scales: list) -> list:
+    import cv2
+    import numpy as np
+    from PIL import Image
+
+    from core_crypto import generate_vcs
+    from main import _compose_share_a_with_label, _pil_to_bytes
+    from ticket_payload import build_compact_payload
+
+    code = "12345678"
+    payload = build_compact_payload(str(uuid.uuid4()), code, int(time.time()) + 86400)
+    share_a, share_b = generate_vcs(payload)
+    labelled = _compose_share_a_with_label(share_a, code, "bench")
+    share_a_png = _pil_to_bytes(labelled)
+
+    paths = {"share_b": os.path.join(workdir, "share_b.png"), "expected": os.path.join(workdir, "expected.txt")}
+    with open(paths["share_b"], "wb") as f:
+        f.write(_pil_to_bytes(share_b.convert("1", dither=Image.Dither.NONE)))
+    with open(paths["expected"], "w", encoding="utf-8") as f:
+        f.write(f"{code}\n{payload}")
+
+    uploads = []
+    canonical = os.path.join(workdir, "canonical.png")
+    with open(canonical, "wb") as f:
+        f.write(share_a_png)
+    uploads.append(("canonical PNG", canonical))
+
+    gray = np.array(labelled.convert("L"))
+    for scale in scales:
+        photo = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+        _, encoded = cv2.imencode(".jpg", cv2.cvtColor(photo, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        path = os.path.join(workdir, f"photo_x{scale}.jpg")
+        encoded.tofile(path)
+        uploads.append((f"{photo.shape[1]}x{photo.shape[0]} JPEG ({photo.size / 1e6:.0f}MP)", path))
+    return uploads, paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4, 6])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(*args.child, args.iterations)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="vcs-ingest-")
+    uploads, paths = _make_uploads(workdir, args.scales)
+
+    print("=== Verify ingest benchmark (medians; +peak = max RSS above the post-warm-up baseline) ===")
+    print(
+        f"{'upload':<26} {'size':>8} {'reduced':>7} {'factor':>6} {'max RSS':>9} {'+peak':>9} "
+        f"{'time':>9} {'code':>5} {'decoded':>7}"
+    )
+    for label, path in uploads:
+        for reduced in ("0", "1"):
+            env = dict(os.environ, REDUCED_DECODE=reduced, WARM_UP_ON_STARTUP="0")
+            env.setdefault("SIGNING_SECRET", "test-secret")
+            out = subprocess.run(
+                [
+                    sys.executable, __file__, "--iterations", str(args.iterations),
+                    "--child", path, paths["share_b"], paths["expected"],
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(
+                f"{label:<26} {os.path.getsize(path) / 1024:>6.0f}KB {'yes' if reduced == '1' else 'no':>7} "
+                f"{r['stack_factor']:>3}/{r['label_factor']:<2} {r['peak_kb'] / 1024:>7.1f}MB "
+                f"{(r['peak_kb'] - r['baseline_kb']) / 1024:>7.1f}MB "
+                f"{r['ms']:>7.1f}ms {r['code']:>5} {r['decoded']:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare the legacy (pipe-separated text) and compact (binary + base45) ticket
+payloads end to end, without the API/DB.
+
+Run:
+  SIGNING_SECRET=test-secret uv run python bench_payload.py [--iterations 5]
+
+Per format it reports payload length, QR version, share pixel count, Share B
+PNG size, create latency (payload + VCS generation + label + PNG encode +
+ORB features) and verify latency (stack + decode + payload check) on the
+canonical Share A.
+"""
+
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+import qrcode
+from PIL import Image
+
+if "SIGNING_SECRET" not in os.environ:
+    os.environ["SIGNING_SECRET"] = "test-secret"
+
+from core_crypto import QR_BORDER, QR_BOX_SIZE, compute_alignment_features, generate_vcs, stack_and_decode
+from main import _compose_share_a_with_label, _pil_to_bytes
+from ticket_payload import build_compact_payload, build_legacy_payload, verify_payload
+
+
+def _qr_version(data: str) -> int:
+    qr = qrcode.QRCode(border=QR_BORDER, box_size=QR_BOX_SIZE, error_correction=qrcode.constants.ERROR_CORRECT_H)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+def bench_format(fmt: str, iterations: int) -> dict:
+    create_ms, verify_ms = [], []
+    decoded_ok = 0
+    for i in range(iterations):
+        user_uuid = str(uuid.uuid4())
+        check_in_code = f"{i:08d}"
+        expires_at = int(time.time()) + 86400
+
+        started = time.perf_counter()
+        if fmt == "legacy":
+            payload = build_legacy_payload("Test User", "test.user@example.com", user_uuid, check_in_code, expires_at)
+        else:
+            payload = build_compact_payload(user_uuid, check_in_code, expires_at)
+        share_a, share_b = generate_vcs(payload)
+        share_a_bytes = _pil_to_bytes(_compose_share_a_with_label(share_a, check_in_code, user_uuid))
+        share_b_bytes = _pil_to_bytes(share_b.convert("1", dither=Image.Dither.NONE))
+        compute_alignment_features(share_b)
+        create_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        decoded, _, _ = stack_and_decode(share_a_bytes, share_b_bytes)
+        ok = bool(decoded) and verify_payload(decoded)[0]
+        verify_ms.append((time.perf_counter() - started) * 1000)
+        decoded_ok += ok
+
+    return {
+        "format": fmt,
+        "payload_len": len(payload),
+        "qr_version": _qr_version(payload),
+        "share_px": share_b.width * share_b.height,
+        "share_dims": f"{share_b.width}x{share_b.height}",
+        "share_b_bytes": len(share_b_bytes),
+        "create_ms": statistics.median(create_ms),
+        "verify_ms": statistics.median(verify_ms),
+        "decoded": f"{decoded_ok}/{iterations}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [bench_format(fmt, args.iterations) for fmt in ("legacy", "compact")]
+
+    print("=== Payload format benchmark (medians) ===")
+    print(
+        f"{'format':<8} {'chars':>5} {'QR ver':>6} {'share':>10} {'pixels':>9} "
+        f"{'share B':>9} {'create':>9} {'verify':>9} {'decoded':>8}"
+    )
+    for r in rows:
+        print(
+            f"{r['format']:<8} {r['payload_len']:>5} {r['qr_version']:>6} {r['share_dims']:>10} "
+            f"{r['share_px']:>9} {r['share_b_bytes']:>8}B {r['create_ms']:>7.1f}ms "
+            f"{r['verify_ms']:>7.1f}ms {r['decoded']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
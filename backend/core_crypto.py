@@ -1,13 +1,45 @@
 import base64
+import functools
 import io
 import math
 import secrets
-from typing import Tuple
+import struct
+from typing import Callable, Optional, Tuple, Union
 
 import cv2
 import numpy as np
-import qrcode
-from PIL import Image
+from PIL import Image, ImageDraw
+
+from image_decode import decode_gray, reduction_factor, sniff_image
+
+QR_BORDER = 4
+QR_BOX_SIZE = 4
+QR_MIN_SIZE = 300
+
+ARUCO_MARKER_SIZE = 80
+ARUCO_BORDER_WIDTH = 100
+ARUCO_MARGIN = 10
+
+# Canonical Share A layout: the share on top, a label band below, and a row of
+# marker cells in the band's bottom-right corner identifying our own render.
+SHARE_A_LABEL_HEIGHT = 140
+LAYOUT_MARKER_BITS = 0xB2E5
+LAYOUT_MARKER_LENGTH = 16
+LAYOUT_MARKER_CELL = 4
+LAYOUT_MARKER_MARGIN = 6
+CODE_LABEL_TARGET_SIDE = 920  # narrowest labelled Share A we render (compact payloads)
+
+ADAPTIVE_BLOCK_SIZE = 15
+ADAPTIVE_C = 5
+MODULE_PIXELS = 4
+
+ORB_FEATURES = 2000
+# Strongest Share B keypoints kept in the stored blob (~20 KB instead of ~68 KB)
+ALIGNMENT_STORED_KEYPOINTS = 500
+ALIGNMENT_FEATURES_MAGIC = b"ORB1"
+_ALIGNMENT_HEADER = struct.Struct("<4sIH")
+# Share B features as bytes, or a loader called only if the ORB strategy runs
+FeatureSource = Union[bytes, Callable[[], Optional[bytes]], None]
 
 
 def _pil_to_bytes(img: Image.Image, fmt: str = "PNG") -> bytes:
@@ -21,14 +53,18 @@ def generate_vcs(data: str) -> Tuple[Image.Image, Image.Image]:
     Generate two VCS shares from the provided data string.
     Share A includes ArUco markers in corners for robust alignment at any rotation.
     """
-    qr = qrcode.QRCode(border=4, box_size=4, error_correction=qrcode.constants.ERROR_CORRECT_H)
+    import qrcode  # only the create path needs it
+
+    qr = qrcode.QRCode(
+        border=QR_BORDER, box_size=QR_BOX_SIZE, error_correction=qrcode.constants.ERROR_CORRECT_H
+    )
     qr.add_data(data)
     qr.make(fit=True)
     qr_img = qr.make_image(fill_color="black", back_color="white").convert("1")
 
     # Upscale by integer factor to keep modules crisp and ensure even dimensions.
     w, h = qr_img.size
-    scale = max(1, math.ceil(300 / max(w, h)))
+    scale = max(1, math.ceil(QR_MIN_SIZE / max(w, h)))
     qr_img = qr_img.resize((w * scale, h * scale), resample=Image.NEAREST)
 
     if qr_img.size[0] % 2 != 0 or qr_img.size[1] % 2 != 0:
@@ -88,8 +124,8 @@ def _add_aruco_markers(share_img: Image.Image) -> Image.Image:
 
     # ArUco settings
     aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
-    marker_size = 80  # pixels
-    border_width = 100  # white border around VCS
+    marker_size = ARUCO_MARKER_SIZE  # pixels
+    border_width = ARUCO_BORDER_WIDTH  # white border around VCS
 
     # Create new image with border
     h_new = h_vcs + 2 * border_width
@@ -103,7 +139,7 @@ def _add_aruco_markers(share_img: Image.Image) -> Image.Image:
 
     # Add ArUco markers in the border (corners)
     marker_ids = [0, 1, 2, 3]
-    margin = 10  # pixels from edge of border
+    margin = ARUCO_MARGIN  # pixels from edge of border
 
     positions = [
         (margin, margin),  # Top-left
@@ -121,82 +157,205 @@ def _add_aruco_markers(share_img: Image.Image) -> Image.Image:
     return Image.fromarray(img_with_border)
 
 
-def _load_cv_gray(image_bytes: bytes) -> np.ndarray:
-    array = np.frombuffer(image_bytes, np.uint8)
-    return cv2.imdecode(array, cv2.IMREAD_GRAYSCALE)
-
+def compute_alignment_features(share_b_img: Image.Image) -> bytes:
+    """
+    Precompute ORB keypoints + descriptors for Share B so verification can skip
+    feature extraction on the server-side share.
 
-def robust_stack(img_share_a_bytes: bytes, img_share_b_bytes: bytes) -> Tuple[Image.Image, Image.Image]:
+    Packed layout: header (magic, count, descriptor width), float32 (x, y) per
+    keypoint, then the raw uint8 descriptors. Only the ALIGNMENT_STORED_KEYPOINTS
+    strongest keypoints (by response) are kept, and only their coordinates,
+    because the homography step never looks at size/angle/response.
+    """
+    share_b_gray = np.array(share_b_img.convert("L"))
+    orb = cv2.ORB_create(ORB_FEATURES)
+    keypoints, descriptors = orb.detectAndCompute(share_b_gray, None)
+    if descriptors is None or not keypoints:
+        return _ALIGNMENT_HEADER.pack(ALIGNMENT_FEATURES_MAGIC, 0, 0)
+
+    strongest = sorted(range(len(keypoints)), key=lambda i: keypoints[i].response, reverse=True)
+    strongest = strongest[:ALIGNMENT_STORED_KEYPOINTS]
+    keypoints = [keypoints[i] for i in strongest]
+    points = np.float32([kp.pt for kp in keypoints])
+    descriptors = np.ascontiguousarray(descriptors[strongest], dtype=np.uint8)
+    header = _ALIGNMENT_HEADER.pack(ALIGNMENT_FEATURES_MAGIC, len(keypoints), descriptors.shape[1])
+    return header + points.astype("<f4").tobytes() + descriptors.tobytes()
+
+
+def _unpack_alignment_features(blob: Optional[bytes]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Return (points, descriptors) from compute_alignment_features output, or None if unusable."""
+    if not blob or len(blob) < _ALIGNMENT_HEADER.size:
+        return None
+    magic, count, width = _ALIGNMENT_HEADER.unpack_from(blob)
+    if magic != ALIGNMENT_FEATURES_MAGIC:
+        return None
+    offset = _ALIGNMENT_HEADER.size
+    points_size = count * 2 * 4
+    if len(blob) != offset + points_size + count * width:
+        return None
+    points = np.frombuffer(blob, dtype="<f4", count=count * 2, offset=offset).reshape(-1, 2)
+    descriptors = np.frombuffer(blob, dtype=np.uint8, offset=offset + points_size).reshape(count, width)
+    return points, descriptors
+
+
+def _layout_marker_cells(width: int, height: int):
+    x0 = width - LAYOUT_MARKER_MARGIN - LAYOUT_MARKER_LENGTH * LAYOUT_MARKER_CELL
+    y0 = height - LAYOUT_MARKER_MARGIN - LAYOUT_MARKER_CELL
+    for i in range(LAYOUT_MARKER_LENGTH):
+        bit = (LAYOUT_MARKER_BITS >> (LAYOUT_MARKER_LENGTH - 1 - i)) & 1
+        yield bit, x0 + i * LAYOUT_MARKER_CELL, y0
+
+
+def draw_layout_marker(canvas: Image.Image) -> None:
+    """Stamp the canonical layout marker into the bottom-right corner of a labelled Share A."""
+    draw = ImageDraw.Draw(canvas)
+    for bit, x, y in _layout_marker_cells(canvas.width, canvas.height):
+        if bit:
+            draw.rectangle(
+                [x, y, x + LAYOUT_MARKER_CELL - 1, y + LAYOUT_MARKER_CELL - 1], fill="black"
+            )
+
+
+def _has_layout_marker(gray: np.ndarray) -> bool:
+    h, w = gray.shape
+    half = LAYOUT_MARKER_CELL // 2
+    for bit, x, y in _layout_marker_cells(w, h):
+        if (gray[y + half, x + half] < 128) != bool(bit):
+            return False
+    return True
+
+
+def _load_cv_gray(image_bytes: bytes, factor: int = 1) -> np.ndarray:
+    return decode_gray(image_bytes, factor)
+
+
+def robust_stack(
+    img_share_a_bytes: bytes,
+    img_share_b_bytes: bytes,
+    share_b_features: FeatureSource = None,
+) -> Tuple[Image.Image, Image.Image]:
     """
     Align share A to share B. Tries multiple strategies in order:
+    0. Canonical upload (our own lossless Share A render, sliced directly)
     1. ArUco marker detection (most robust, works at any rotation)
     2. Direct stacking (fast path for digital uploads)
     3. ORB + Homography alignment (fallback for scans without markers)
     Returns the best result (stacked_pil, aligned_share_a_pil).
+
+    share_b_features: optional output of compute_alignment_features for Share B,
+    or a zero-argument callable returning it (only called if ORB runs); when
+    valid, ORB extraction only runs on Share A.
+    """
+    _, stacked, aligned = stack_and_decode(img_share_a_bytes, img_share_b_bytes, share_b_features)
+    return stacked, aligned
+
+
+def stack_and_decode(
+    img_share_a_bytes: bytes,
+    img_share_b_bytes: bytes,
+    share_b_features: FeatureSource = None,
+) -> Tuple[str, Image.Image, Image.Image]:
+    """
+    Same strategies as robust_stack, but also returns the decoded QR data
+    ("" if nothing decoded) so callers don't decode the stacked image again.
     """
+    canonical = _stack_canonical(img_share_a_bytes, img_share_b_bytes)
+    if canonical is not None:
+        return canonical
+    return _robust_stack(img_share_a_bytes, img_share_b_bytes, share_b_features)
+
+
+def _stack_canonical(
+    img_share_a_bytes: bytes, img_share_b_bytes: bytes
+) -> Optional[Tuple[str, Image.Image, Image.Image]]:
+    """
+    Fast path for an unmodified PNG of the labelled Share A we rendered: the
+    dimensions come from the PNG headers and the layout marker confirms the
+    label band, so the VCS region is sliced directly without ArUco detection,
+    adaptive thresholding or alignment. Returns None to fall back.
+    """
+    info_a = sniff_image(img_share_a_bytes)
+    info_b = sniff_image(img_share_b_bytes)
+    if info_a is None or info_b is None or info_a.format != "png" or info_b.format != "png":
+        return None
+    if (info_a.width, info_a.height) != (info_b.width, info_b.height + SHARE_A_LABEL_HEIGHT):
+        return None
+
     share_a_gray = _load_cv_gray(img_share_a_bytes)
+    if share_a_gray is None or not _has_layout_marker(share_a_gray):
+        return None
     share_b_gray = _load_cv_gray(img_share_b_bytes)
-    if share_a_gray is None or share_b_gray is None:
+    if share_b_gray is None:
+        return None
+
+    # Lossless render: pixels are exactly 0/255, so no thresholding is needed
+    h, w = share_b_gray.shape
+    border = ARUCO_BORDER_WIDTH
+    vcs_a = share_a_gray[border : h - border, border : w - border]
+    vcs_b = share_b_gray[border : h - border, border : w - border]
+
+    stacked = Image.fromarray(_secret_to_modules(_reconstruct_secret(vcs_a, vcs_b)))
+    data = decode_qr_from_image(stacked)
+    if not data:
+        return None
+    return data, stacked, _bilevel_image(vcs_a)
+
+
+def _robust_stack(
+    img_share_a_bytes: bytes,
+    img_share_b_bytes: bytes,
+    share_b_features: FeatureSource = None,
+) -> Tuple[str, Image.Image, Image.Image]:
+    share_b_gray = _load_cv_gray(img_share_b_bytes)
+    if share_b_gray is None:
+        raise ValueError("Invalid image data for stacking")
+    # Photos far larger than Share B are decoded at 1/2, 1/4 or 1/8 size;
+    # every strategy below resamples Share A to Share B's grid anyway.
+    share_a_gray = _load_cv_gray(
+        img_share_a_bytes, reduction_factor(img_share_a_bytes, max(share_b_gray.shape))
+    )
+    if share_a_gray is None:
         raise ValueError("Invalid image data for stacking")
 
-    # Store original Share A for ArUco detection (don't crop yet!)
-    share_a_original = share_a_gray.copy()
+    # Threshold each share exactly once; every strategy below reuses these.
+    bin_a = _binarize(share_a_gray)
+    bin_b = _binarize(share_b_gray)
 
     # Crop Share A to Share B dimensions for direct stacking (Strategy 2)
     share_a_cropped = share_a_gray
+    bin_a_cropped = bin_a
     if share_a_gray.shape[0] > share_b_gray.shape[0]:
         share_a_cropped = share_a_gray[: share_b_gray.shape[0], : share_b_gray.shape[1]]
+        bin_a_cropped = bin_a[: share_b_gray.shape[0], : share_b_gray.shape[1]]
 
-    def process_pair(img_a, img_b, mask_aruco=False):
+    def process_pair(pair_a, pair_b, strip_border=True):
         # Resize if needed (safety)
-        if img_a.shape != img_b.shape:
-             try:
-                img_a = cv2.resize(img_a, (img_b.shape[1], img_b.shape[0]))
-             except Exception:
+        if pair_a.shape != pair_b.shape:
+            try:
+                pair_a = cv2.resize(
+                    pair_a, (pair_b.shape[1], pair_b.shape[0]), interpolation=cv2.INTER_NEAREST
+                )
+            except Exception:
                 return Image.new("L", (1, 1)), Image.new("L", (1, 1))
 
-        _, bin_a = cv2.threshold(img_a, 128, 255, cv2.THRESH_BINARY)
-        _, bin_b = cv2.threshold(img_b, 128, 255, cv2.THRESH_BINARY)
-
-        # If masking ArUco regions, fill them with white (255) before XOR
-        if mask_aruco:
-            marker_size = 80
-            margin = 10
-            h, w = bin_a.shape
-
-            # Define marker regions (corners)
-            marker_regions = [
-                (margin, margin, margin + marker_size, margin + marker_size),  # Top-left
-                (w - marker_size - margin, margin, w - margin, margin + marker_size),  # Top-right
-                (w - marker_size - margin, h - marker_size - margin, w - margin, h - margin),  # Bottom-right
-                (margin, h - marker_size - margin, margin + marker_size, h - margin),  # Bottom-left
-            ]
-
-            # Fill marker regions with white in both images
-            for (x1, y1, x2, y2) in marker_regions:
-                bin_a[y1:y2, x1:x2] = 255
-                bin_b[y1:y2, x1:x2] = 255
-
-        stacked = cv2.bitwise_not(cv2.bitwise_xor(bin_a, bin_b))
+        # The ArUco border carries no secret data; drop it so the grid starts at the VCS origin
+        if strip_border:
+            pair_a = _strip_aruco_border(pair_a)
+            pair_b = _strip_aruco_border(pair_b)
 
-        # Downsample
-        h, w = stacked.shape
-        downsampled = stacked
-        if h % 2 == 0 and w % 2 == 0:
-            downsampled = cv2.resize(stacked, (w // 2, h // 2), interpolation=cv2.INTER_NEAREST)
-
-        return Image.fromarray(downsampled), Image.fromarray(bin_a)
+        secret = _reconstruct_secret(pair_a, pair_b)
+        return Image.fromarray(_secret_to_modules(secret)), _bilevel_image(pair_a)
 
     # Strategy 1: ArUco Marker Detection (Robust for cardinal rotations)
     # Use simple array operations to de-rotate Share A
     # This preserves VCS pattern perfectly (no interpolation artifacts)
-    aligned_a = share_a_cropped
+    aligned_a = bin_a_cropped
     try:
-        rotation_angle, border_width = _detect_aruco_homography(share_a_original, share_b_gray)
+        rotation_angle, border_width = _detect_aruco_homography(share_a_gray, share_b_gray)
         if rotation_angle is not None and rotation_angle in [0, 90, 180, 270]:
             # Extract VCS portions (remove border from both shares)
-            share_a_vcs = share_a_original[border_width:-border_width, border_width:-border_width]
-            share_b_vcs = share_b_gray[border_width:-border_width, border_width:-border_width]
+            share_a_vcs = bin_a[border_width:-border_width, border_width:-border_width]
+            share_b_vcs = bin_b[border_width:-border_width, border_width:-border_width]
 
             # De-rotate using simple array operations (pixel-perfect)
             if rotation_angle == 90:
@@ -210,45 +369,128 @@ def robust_stack(img_share_a_bytes: bytes, img_share_b_bytes: bytes) -> Tuple[Im
             else:  # rotation_angle == 0
                 share_a_vcs_aligned = share_a_vcs
 
-            # Stack VCS portions (no masking needed - ArUco markers are outside)
-            aruco_stacked, aruco_aligned = process_pair(share_a_vcs_aligned, share_b_vcs, mask_aruco=False)
-            if decode_qr_from_image(aruco_stacked):
-                return aruco_stacked, aruco_aligned
+            # Stack VCS portions (border already removed)
+            aruco_stacked, aruco_aligned = process_pair(
+                np.ascontiguousarray(share_a_vcs_aligned), share_b_vcs, strip_border=False
+            )
+            aruco_data = decode_qr_from_image(aruco_stacked)
+            if aruco_data:
+                return aruco_data, aruco_stacked, aruco_aligned
     except Exception:
         pass  # Fallback to next strategy
 
     # Strategy 2: Direct Stacking (Fast path for digital uploads)
-    direct_stacked, direct_aligned = process_pair(share_a_cropped, share_b_gray)
-    if decode_qr_from_image(direct_stacked):
-        return direct_stacked, direct_aligned
+    direct_stacked, direct_aligned = process_pair(bin_a_cropped, bin_b)
+    direct_data = decode_qr_from_image(direct_stacked)
+    if direct_data:
+        return direct_data, direct_stacked, direct_aligned
 
     # Strategy 3: ORB Alignment (Fallback for scans/photos without ArUco)
     try:
-        orb = cv2.ORB_create(2000)
+        orb = cv2.ORB_create(ORB_FEATURES)
         kp_a, des_a = orb.detectAndCompute(share_a_cropped, None)
-        kp_b, des_b = orb.detectAndCompute(share_b_gray, None)
-
-        if des_a is not None and des_b is not None and len(kp_a) >= 4 and len(kp_b) >= 4:
+        if callable(share_b_features):
+            share_b_features = share_b_features()
+        precomputed = _unpack_alignment_features(share_b_features)
+        if precomputed is not None:
+            pts_b, des_b = precomputed
+        else:
+            kp_b, des_b = orb.detectAndCompute(share_b_gray, None)
+            pts_b = np.float32([kp.pt for kp in kp_b]).reshape(-1, 2)
+
+        if des_a is not None and des_b is not None and len(kp_a) >= 4 and len(pts_b) >= 4:
             matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
             matches = matcher.match(des_a, des_b)
             matches = sorted(matches, key=lambda m: m.distance)
             if len(matches) >= 4:
                 best_matches = matches[:50]
                 src_pts = np.float32([kp_a[m.queryIdx].pt for m in best_matches]).reshape(-1, 1, 2)
-                dst_pts = np.float32([kp_b[m.trainIdx].pt for m in best_matches]).reshape(-1, 1, 2)
+                dst_pts = np.float32([pts_b[m.trainIdx] for m in best_matches]).reshape(-1, 1, 2)
                 H, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
                 if H is not None:
                     h, w = share_b_gray.shape
                     aligned_a = cv2.warpPerspective(
-                        share_a_cropped, H, (w, h), flags=cv2.INTER_NEAREST
+                        bin_a_cropped, H, (w, h), flags=cv2.INTER_NEAREST
                     )
     except Exception:
         pass # Fallback to original if alignment fails
 
-    aligned_stacked, aligned_img_pil = process_pair(aligned_a, share_b_gray)
+    aligned_stacked, aligned_img_pil = process_pair(aligned_a, bin_b)
 
     # Return the aligned result (even if it fails to decode, it's our best bet for debug)
-    return aligned_stacked, aligned_img_pil
+    return decode_qr_from_image(aligned_stacked), aligned_stacked, aligned_img_pil
+
+
+def _bilevel_image(binary: np.ndarray) -> Image.Image:
+    """1-bit PIL image from a 0/255 array; encodes to PNG ~10x faster than mode L."""
+    # fromarray on a strided view (border-cropped share) copies element-wise, ~40x slower
+    return Image.fromarray(np.ascontiguousarray(binary)).convert("1", dither=Image.Dither.NONE)
+
+
+def _binarize(gray: np.ndarray) -> np.ndarray:
+    """Adaptive threshold so uneven lighting across a photo doesn't flip whole regions."""
+    return cv2.adaptiveThreshold(
+        gray,
+        255,
+        cv2.ADAPTIVE_THRESH_MEAN_C,
+        cv2.THRESH_BINARY,
+        ADAPTIVE_BLOCK_SIZE,
+        ADAPTIVE_C,
+    )
+
+
+def _strip_aruco_border(img: np.ndarray) -> np.ndarray:
+    h, w = img.shape[:2]
+    if h <= 2 * ARUCO_BORDER_WIDTH or w <= 2 * ARUCO_BORDER_WIDTH:
+        return img
+    return img[ARUCO_BORDER_WIDTH:-ARUCO_BORDER_WIDTH, ARUCO_BORDER_WIDTH:-ARUCO_BORDER_WIDTH]
+
+
+def _reconstruct_secret(bin_a: np.ndarray, bin_b: np.ndarray) -> np.ndarray:
+    """
+    Recover the secret image from two aligned, binarized VCS regions.
+
+    Each secret pixel is a 2x2 subpixel block. A white secret pixel has identical
+    blocks in both shares and a black one has complementary blocks, so the pixel
+    is decided by how many of its 4 subpixels agree (majority vote, ties white).
+    """
+    h = min(bin_a.shape[0], bin_b.shape[0]) // 2 * 2
+    w = min(bin_a.shape[1], bin_b.shape[1]) // 2 * 2
+    agree = (bin_a[:h, :w] == bin_b[:h, :w]).view(np.uint8)
+    votes = agree[0::2, 0::2] + agree[0::2, 1::2] + agree[1::2, 0::2] + agree[1::2, 1::2]
+    return np.where(votes >= 2, 255, 0).astype(np.uint8)
+
+
+def _qr_module_pixels(secret_w: int, secret_h: int) -> Optional[int]:
+    """Secret pixels per QR module implied by generate_vcs for this size, or None if it doesn't fit."""
+    if secret_w != secret_h:
+        return None
+    for version in range(1, 41):
+        modules = 17 + 4 * version + 2 * QR_BORDER
+        qr_px = modules * QR_BOX_SIZE
+        scale = max(1, math.ceil(QR_MIN_SIZE / qr_px))
+        if qr_px * scale == secret_w:
+            return QR_BOX_SIZE * scale
+    return None
+
+
+def _secret_to_modules(secret: np.ndarray) -> np.ndarray:
+    """
+    Collapse the secret image to one value per QR module (vote over the module
+    centre), rendered at MODULE_PIXELS per module. Falls back to the secret
+    image itself when the size doesn't match the generate_vcs grid.
+    """
+    h, w = secret.shape
+    module_px = _qr_module_pixels(w, h)
+    if module_px is None:
+        return secret
+
+    n = w // module_px
+    inset = module_px // 4
+    blocks = secret.reshape(n, module_px, n, module_px)
+    centres = blocks[:, inset : module_px - inset, :, inset : module_px - inset]
+    modules = np.where(centres.mean(axis=(1, 3)) >= 128, 255, 0).astype(np.uint8)
+    return np.kron(modules, np.ones((MODULE_PIXELS, MODULE_PIXELS), dtype=np.uint8))
 
 
 def _detect_aruco_homography(share_a_gray: np.ndarray, share_b_gray: np.ndarray) -> tuple:
@@ -270,7 +512,7 @@ def _detect_aruco_homography(share_a_gray: np.ndarray, share_b_gray: np.ndarray)
     if ids_a is None or len(ids_a) < 4:
         return None, 0
 
-    border_width = 100  # Border width used in _add_aruco_markers
+    border_width = ARUCO_BORDER_WIDTH  # Border width used in _add_aruco_markers
 
     # Find where each marker ID is located in Share A
     detected_positions = {}
@@ -314,12 +556,19 @@ def _detect_aruco_homography(share_a_gray: np.ndarray, share_b_gray: np.ndarray)
     return rotation_angle, border_width
 
 
-def decode_qr_from_image(img: Image.Image) -> str:
-    """Decode QR using pyzbar if available, otherwise fallback to OpenCV."""
+@functools.lru_cache(maxsize=None)
+def get_qr_decoder() -> Optional[Callable]:
+    """pyzbar's decode if libzbar is available, else None. Resolved once per process."""
     try:
         from pyzbar.pyzbar import decode as qr_decode
     except ImportError:
-        qr_decode = None
+        return None
+    return qr_decode
+
+
+def decode_qr_from_image(img: Image.Image) -> str:
+    """Decode QR using pyzbar if available, otherwise fallback to OpenCV."""
+    qr_decode = get_qr_decoder()
 
     if qr_decode:
         decoded = qr_decode(img)
@@ -339,6 +588,71 @@ def decode_qr_from_image(img: Image.Image) -> str:
     return data or ""
 
 
+def extract_check_in_code(img_bytes: bytes) -> Optional[str]:
+    """Try to read the code QR overlaid on Share A using pyzbar then OpenCV."""
+    # Grayscale is all the QR decoders need; large photos are decoded reduced
+    factor = reduction_factor(img_bytes, CODE_LABEL_TARGET_SIDE)
+    gray = decode_gray(img_bytes, factor)
+    if gray is None:
+        return None
+    img = Image.fromarray(gray)
+
+    qr_decode = get_qr_decoder()
+
+    def try_decode_pyzbar(pil_img):
+        if qr_decode is None:
+            return None
+        decoded = qr_decode(pil_img)
+        for d in decoded:
+            data = d.data.decode("utf-8")
+            if data.isdigit() and 6 <= len(data) <= 12:
+                return data
+        return None
+
+    def try_decode_cv(pil_img):
+        arr = np.array(pil_img)
+        detector = cv2.QRCodeDetector()
+        data, _, _ = detector.detectAndDecode(arr)
+        if data and data.isdigit() and 6 <= len(data) <= 12:
+            return data
+        return None
+
+    w, h = img.size
+    band_height = min(200, h)
+    label_band = img.crop((0, h - band_height, w, h))
+
+    for attempt in (
+        lambda: try_decode_pyzbar(label_band),
+        lambda: try_decode_pyzbar(Image.fromarray(255 - np.array(label_band))),
+        lambda: try_decode_cv(label_band),
+        lambda: try_decode_cv(Image.fromarray(255 - np.array(label_band))),
+    ):
+        code = attempt()
+        if code:
+            return code
+    return None
+
+
+def warm_up() -> None:
+    """
+    Pay one-off initialisation costs (lazy imports, libzbar load, OpenCV
+    detector/codec setup) before the first request instead of during it.
+    Uses tiny images so it stays in the low milliseconds.
+    """
+    import qrcode
+
+    code_img = qrcode.make("warmup", box_size=2, border=2).convert("L")
+    decode_qr_from_image(code_img)
+
+    blank = np.full((64, 64), 255, dtype=np.uint8)
+    cv2.imdecode(cv2.imencode(".png", blank)[1], cv2.IMREAD_GRAYSCALE)
+    _binarize(blank)
+    cv2.aruco.ArucoDetector(
+        cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50), cv2.aruco.DetectorParameters()
+    ).detectMarkers(blank)
+    cv2.ORB_create(ORB_FEATURES).detectAndCompute(blank, None)
+
+
 def image_to_base64(img: Image.Image) -> str:
     return base64.b64encode(_pil_to_bytes(img)).decode("utf-8")
 
@@ -18,20 +18,16 @@ import uuid
 
 from PIL import Image
 
-from core_crypto import decode_qr_from_image, generate_vcs, robust_stack
-from main import (
-    _build_payload,
-    _compose_share_a_with_label,
-    _extract_check_in_code,
-    _verify_payload,
-)
+from core_crypto import decode_qr_from_image, extract_check_in_code, generate_vcs, robust_stack
+from main import _compose_share_a_with_label
+from ticket_payload import build_legacy_payload, verify_payload
 
 
 def main():
     # Synthetic ticket data
     user_uuid = str(uuid.uuid4())
     check_in_code = "12345678"
-    payload = _build_payload("Test User", "user@example.com", user_uuid, check_in_code, 4102444800)
+    payload = build_legacy_payload("Test User", "user@example.com", user_uuid, check_in_code, 4102444800)
 
     # Generate shares
     share_a, share_b = generate_vcs(payload)
@@ -46,8 +42,8 @@ def main():
     # Stack and decode
     stacked, aligned = robust_stack(buf_a.getvalue(), buf_b.getvalue())
     pyzbar_decoded = decode_qr_from_image(stacked)
-    code_extracted = _extract_check_in_code(buf_a.getvalue())
-    valid, err, parsed = _verify_payload(pyzbar_decoded) if pyzbar_decoded else (False, "empty", None)
+    code_extracted = extract_check_in_code(buf_a.getvalue())
+    valid, err, parsed = verify_payload(pyzbar_decoded) if pyzbar_decoded else (False, "empty", None)
 
     # Save artifacts
     labeled_share_a.save("share_a_labeled.png")
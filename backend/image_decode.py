@@ -0,0 +1,98 @@
+"""
+Header sniffing and reduced-resolution decoding for share images. Depends only
+on OpenCV/numpy, so the crypto core and offline tools can use it without the
+API stack (upload limits and HTTP errors live in ingest.py).
+
+Phone photos of a ticket are often 12-50 MP while the share grid is about
+1000 px on a side. Dimensions come from the PNG/JPEG header, and images at
+least twice the size of the share grid are decoded with
+IMREAD_REDUCED_GRAYSCALE_{2,4,8} (libjpeg DCT scaling for JPEG, so the
+full-size bitmap is never built). Alignment resamples Share A onto Share B's
+grid anyway, so the extra pixels carry nothing.
+"""
+
+import os
+import struct
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "60000000"))
+REDUCED_DECODE = os.getenv("REDUCED_DECODE", "1") == "1"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOF0-SOF15 minus DHT (C4), JPG (C8) and DAC (CC)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_REDUCED_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+
+
+def sniff_image(data: bytes) -> Optional[ImageInfo]:
+    """Format and (width, height) from the PNG IHDR or JPEG SOF header, without decoding pixels."""
+    if data[:8] == _PNG_SIGNATURE and data[12:16] == b"IHDR" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return ImageInfo("png", width, height)
+    if data[:2] == b"\xff\xd8":
+        return _sniff_jpeg(data)
+    return None
+
+
+def _sniff_jpeg(data: bytes) -> Optional[ImageInfo]:
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # standalone markers
+            pos += 2
+            continue
+        (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+        if marker in _JPEG_SOF_MARKERS:
+            if pos + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[pos + 5 : pos + 9])
+            return ImageInfo("jpeg", width, height)
+        pos += 2 + length
+    return None
+
+
+def reduction_factor(data: bytes, target_side: int) -> int:
+    """Largest of 8/4/2 that keeps the image's short side >= target_side, else 1."""
+    info = sniff_image(data) if REDUCED_DECODE else None
+    if info is None:
+        return 1
+    short_side = min(info.width, info.height)
+    for factor in (8, 4, 2):
+        if short_side // factor >= target_side:
+            return factor
+    return 1
+
+
+def decode_gray(data: bytes, factor: int = 1) -> Optional[np.ndarray]:
+    """
+    Grayscale decode, at 1/factor of the size for factor 2, 4 or 8. None if
+    undecodable, not a PNG/JPEG, or larger than MAX_IMAGE_PIXELS: formats we
+    can't sniff would otherwise be decoded at whatever size they declare.
+    """
+    info = sniff_image(data)
+    if info is None or info.width * info.height > MAX_IMAGE_PIXELS:
+        return None
+    flag = _REDUCED_FLAGS.get(factor, cv2.IMREAD_GRAYSCALE)
+    try:
+        return cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    except cv2.error:
+        # e.g. over OPENCV_IO_MAX_IMAGE_PIXELS (see Dockerfile)
+        return None
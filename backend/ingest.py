@@ -0,0 +1,48 @@
+"""
+Upload ingestion for verify: bounded reads, the accepted formats and the pixel
+cap, raised as HTTP errors before anything is decoded. Sniffing and reduced-resolution decoding
+themselves live in image_decode.py.
+"""
+
+import os
+
+from fastapi import HTTPException, UploadFile
+
+from image_decode import MAX_IMAGE_PIXELS, ImageInfo, sniff_image
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def read_limited(upload: UploadFile, limit: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an upload in chunks, failing with 413 as soon as it exceeds limit."""
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes.")
+    if upload.size is not None and upload.size > limit:
+        raise too_large
+    chunks = []
+    total = 0
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if total > limit:
+            raise too_large
+        chunks.append(chunk)
+
+
+def check_image_pixels(data: bytes) -> ImageInfo:
+    """
+    Reject anything but PNG/JPEG (415), since other formats' dimensions aren't
+    checked before decoding, and images whose header declares more than
+    MAX_IMAGE_PIXELS (413).
+    """
+    info = sniff_image(data)
+    if info is None:
+        raise HTTPException(status_code=415, detail="Only PNG and JPEG images are accepted.")
+    if info.width * info.height > MAX_IMAGE_PIXELS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image is {info.width}x{info.height}; at most {MAX_IMAGE_PIXELS} pixels are accepted.",
+        )
+    return info
@@ -1,27 +1,57 @@
+import asyncio
 import io
+import json
 import logging
 import os
 import secrets
 import string
 import time
 import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from hashlib import sha256
-from hmac import compare_digest, new as hmac_new
-from typing import Optional
+from typing import List, NamedTuple, Optional
 
-import numpy as np
-import qrcode
-import cv2
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from PIL import Image, ImageDraw, ImageFont
 from pydantic import BaseModel, EmailStr
-from pyzbar.pyzbar import decode as qr_decode
+from sqlalchemy.orm import defer
 
 import models
-from core_crypto import decode_qr_from_image, generate_vcs, image_to_base64, robust_stack
-from database import Base, engine, get_session
+from core_crypto import (
+    SHARE_A_LABEL_HEIGHT,
+    compute_alignment_features,
+    draw_layout_marker,
+    extract_check_in_code,
+    generate_vcs,
+    image_to_base64,
+    warm_up,
+)
+from database import get_session
+from ingest import MAX_UPLOAD_BYTES, check_image_pixels, read_limited
+from rate_limit import acquire_verify_slot
+from sweeper import EXPIRY_SWEEP_INTERVAL, start_sweeper
+from ticket_payload import build_compact_payload, build_legacy_payload
+from verification import (
+    TicketVerifyResponse,
+    evaluate_share,
+    expire_ticket,
+    expired_response,
+    find_archived_ticket,
+    is_past_expiry,
+    redeem_ticket,
+    run_verification,
+)
+from verify_queue import (
+    VERIFY_POLL_INTERVAL,
+    cancel_verify_job,
+    enqueue_verify_job,
+    pop_verify_job_result,
+)
 
 
 def _pil_to_bytes(img) -> bytes:
@@ -53,72 +83,46 @@ class TicketCreateResponse(BaseModel):
     original_payload: str
 
 
-class TicketVerifyResponse(BaseModel):
-    valid: bool
-    original_data: Optional[str] = None
-    debug_image: Optional[str] = None
-    aligned_share_a: Optional[str] = None
-    status: str
-    message: Optional[str] = None
-    decoded_payload: Optional[dict] = None
-    confidence: Optional[float] = 0.0
-
-
 @app.on_event("startup")
 def on_startup():
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s - %(message)s",
     )
-    Base.metadata.create_all(bind=engine)
-
-
-SIGNING_SECRET = os.getenv("SIGNING_SECRET", "dev-secret-change-me").encode("utf-8")
-TICKET_TTL_SECONDS = int(os.getenv("TICKET_TTL_SECONDS", "86400"))  # 24h default
-RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "3"))
-_verify_attempts: dict[str, float] = {}
-
-
-def _sign_payload(payload_str: str) -> str:
-    sig = hmac_new(SIGNING_SECRET, payload_str.encode("utf-8"), sha256).hexdigest()
-    return sig
-
+    # Schema is managed by migrate.py; workers only warm up their decoders here.
+    if WARM_UP_ON_STARTUP:
+        started = time.perf_counter()
+        warm_up()
+        logging.getLogger(__name__).info(
+            "Warm-up finished in %.1f ms", (time.perf_counter() - started) * 1000
+        )
+    if EXPIRY_SWEEP_INTERVAL > 0:
+        app.state.sweeper_stop = start_sweeper(EXPIRY_SWEEP_INTERVAL)
 
-def _build_payload(
-    name: str, email: str, user_uuid: str, check_in_code: str, expires_at: float
-) -> str:
-    payload = f"{name}|{email}|{user_uuid}|{check_in_code}|{int(expires_at)}"
-    sig = _sign_payload(payload)
-    return f"{payload}|{sig}"
 
+@app.on_event("shutdown")
+def on_shutdown():
+    sweeper_stop = getattr(app.state, "sweeper_stop", None)
+    if sweeper_stop is not None:
+        sweeper_stop.set()
 
-def _verify_payload(payload: str) -> tuple[bool, Optional[str], Optional[dict]]:
-    parts = payload.split("|")
-    if len(parts) != 6:
-        return False, "Malformed payload", None
-    name, email, user_uuid, check_in_code, exp_str, sig = parts
-    try:
-        exp = int(exp_str)
-    except ValueError:
-        return False, "Invalid expiry", None
-
-    body = f"{name}|{email}|{user_uuid}|{check_in_code}|{exp}"
-    expected_sig = _sign_payload(body)
-    if not compare_digest(expected_sig, sig):
-        return False, "Signature mismatch", None
-
-    parsed = {
-        "name": name,
-        "email": email,
-        "user_uuid": user_uuid,
-        "check_in_code": check_in_code,
-        "exp": exp,
-    }
 
-    now = int(time.time())
-    if exp < now:
-        return False, "Ticket expired (payload)", parsed
-    return True, None, parsed
+TICKET_TTL_SECONDS = int(os.getenv("TICKET_TTL_SECONDS", "86400"))  # 24h default
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+# "inline": verify in the API process. "queue": hand off to verify_worker.py processes.
+VERIFY_MODE = os.getenv("VERIFY_MODE", "inline")
+VERIFY_JOB_TIMEOUT = float(os.getenv("VERIFY_JOB_TIMEOUT", "30"))
+# Stacked/aligned debug PNGs cost more than the canonical verify itself; opt-in per request
+VERIFY_DEBUG_IMAGES = os.getenv("VERIFY_DEBUG_IMAGES", "0") == "1"
+# "compact" (binary, base45) or "legacy" (pipe-separated text); verify accepts both.
+TICKET_PAYLOAD_FORMAT = os.getenv("TICKET_PAYLOAD_FORMAT", "compact")
+VERIFY_BATCH_MAX_ITEMS = int(os.getenv("VERIFY_BATCH_MAX_ITEMS", "1000"))
+VERIFY_BATCH_WORKERS = int(os.getenv("VERIFY_BATCH_WORKERS", str(os.cpu_count() or 1)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(256 * 1024 * 1024)))
+BATCH_MANIFEST_NAME = "manifest.json"
+
+# Image work for /api/tickets/verify/batch (OpenCV/zbar release the GIL)
+_batch_executor = ThreadPoolExecutor(max_workers=VERIFY_BATCH_WORKERS, thread_name_prefix="verify-batch")
 
 
 def _generate_check_in_code(session) -> str:
@@ -135,6 +139,8 @@ def _generate_check_in_code(session) -> str:
 
 
 def _code_qr_base64(code: str) -> str:
+    import qrcode  # create path only
+
     qr = qrcode.QRCode(border=2, box_size=6)
     qr.add_data(code)
     qr.make(fit=True)
@@ -144,8 +150,10 @@ def _code_qr_base64(code: str) -> str:
 
 def _compose_share_a_with_label(share_a: Image.Image, code: str, uuid_str: str) -> Image.Image:
     """Overlay a larger code QR and readable code/uuid text below the share."""
+    import qrcode  # create path only
+
     base = share_a.convert("RGB")
-    label_height = 140
+    label_height = SHARE_A_LABEL_HEIGHT
     canvas = Image.new("RGB", (base.width, base.height + label_height), color=(255, 255, 255))
     canvas.paste(base, (0, 0))
 
@@ -166,46 +174,11 @@ def _compose_share_a_with_label(share_a: Image.Image, code: str, uuid_str: str)
     text_x = qr_x + qr_size + 12
     text_y = base.height + label_height // 2 - 10
     draw.text((text_x, text_y), text, fill=(20, 20, 20), font=font)
-    return canvas
-
 
-def _extract_check_in_code(img_bytes: bytes) -> Optional[str]:
-    """Try to read the code QR overlaid on Share A using pyzbar then OpenCV."""
-    try:
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    except Exception:
-        return None
-
-    def try_decode_pyzbar(pil_img):
-        decoded = qr_decode(pil_img)
-        for d in decoded:
-            data = d.data.decode("utf-8")
-            if data.isdigit() and 6 <= len(data) <= 12:
-                return data
-        return None
-
-    def try_decode_cv(pil_img):
-        arr = np.array(pil_img)
-        detector = cv2.QRCodeDetector()
-        data, _, _ = detector.detectAndDecode(arr)
-        if data and data.isdigit() and 6 <= len(data) <= 12:
-            return data
-        return None
-
-    w, h = img.size
-    band_height = min(200, h)
-    label_band = img.crop((0, h - band_height, w, h))
-
-    for attempt in (
-        lambda: try_decode_pyzbar(label_band),
-        lambda: try_decode_pyzbar(Image.fromarray(255 - np.array(label_band))),
-        lambda: try_decode_cv(label_band),
-        lambda: try_decode_cv(Image.fromarray(255 - np.array(label_band))),
-    ):
-        code = attempt()
-        if code:
-            return code
-    return None
+    # Lets verify recognise an untouched upload of this exact layout and skip alignment
+    draw_layout_marker(canvas)
+    # Everything drawn is black/white; a 1-bit PNG is much cheaper to decode on verify
+    return canvas.convert("1", dither=Image.Dither.NONE)
 
 
 @app.post("/api/tickets/create", response_model=TicketCreateResponse)
@@ -214,20 +187,26 @@ def create_ticket(payload: TicketCreateRequest):
     expires_at = int(time.time()) + TICKET_TTL_SECONDS
     with get_session() as session:
         check_in_code = _generate_check_in_code(session)
-        combined_data = _build_payload(
-            payload.name, payload.email, user_uuid, check_in_code, expires_at
-        )
+        if TICKET_PAYLOAD_FORMAT == "legacy":
+            combined_data = build_legacy_payload(
+                payload.name, payload.email, user_uuid, check_in_code, expires_at
+            )
+        else:
+            combined_data = build_compact_payload(user_uuid, check_in_code, expires_at)
 
         code_qr_b64 = _code_qr_base64(check_in_code)
         share_a_img, share_b_img = generate_vcs(combined_data)
         composed_share_a = _compose_share_a_with_label(share_a_img, check_in_code, user_uuid)
-        share_b_bytes = _pil_to_bytes(share_b_img)
+        share_b_bytes = _pil_to_bytes(share_b_img.convert("1", dither=Image.Dither.NONE))
         share_a_b64 = image_to_base64(composed_share_a)
 
         ticket = models.Ticket(
             user_uuid=user_uuid,
             check_in_code=check_in_code,
+            holder_name=payload.name,
+            holder_email=payload.email,
             share_b_blob=share_b_bytes,
+            share_b_features=compute_alignment_features(share_b_img),
             expires_at=datetime.utcfromtimestamp(expires_at),
             status="active",
         )
@@ -243,144 +222,310 @@ def create_ticket(payload: TicketCreateRequest):
     )
 
 
+def _check_ticket_before_verify(check_in_code: str, now_ts: float) -> Optional[TicketVerifyResponse]:
+    """
+    Lookup, rate limit and early expiry, before any image work. Returns the
+    final response if the scan needn't be evaluated, None to go on.
+    """
+    with get_session() as session:
+        ticket = (
+            session.query(models.Ticket.id, models.Ticket.status, models.Ticket.expires_at)
+            .filter(models.Ticket.check_in_code == check_in_code)
+            .one_or_none()
+        )
+        if ticket is None:
+            archived = find_archived_ticket(session, check_in_code)
+            if archived is None:
+                raise HTTPException(status_code=404, detail="Ticket not found")
+            return archived
+
+        if not acquire_verify_slot(session, check_in_code, now_ts):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many verification attempts. Please wait a few seconds.",
+            )
+
+    if ticket.status != "redeemed" and is_past_expiry(ticket.expires_at, now_ts):
+        if ticket.status == "active":
+            expire_ticket(ticket.id)
+        return expired_response()
+    return None
+
+
+async def _verify_via_queue(
+    check_in_code: str, share_a_bytes: bytes, now_ts: float, include_debug_images: bool
+) -> TicketVerifyResponse:
+    # Queue calls are blocking DB round trips; keep them off the event loop
+    # so one process can wait on many jobs at once.
+    job_id = await run_in_threadpool(
+        enqueue_verify_job, check_in_code, share_a_bytes, now_ts, include_debug_images
+    )
+    deadline = time.monotonic() + VERIFY_JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        result_json = await run_in_threadpool(pop_verify_job_result, job_id)
+        if result_json is not None:
+            return TicketVerifyResponse.model_validate_json(result_json)
+        await asyncio.sleep(VERIFY_POLL_INTERVAL)
+    if await run_in_threadpool(cancel_verify_job, job_id):
+        raise HTTPException(status_code=504, detail="Timed out waiting for a verify worker; the scan was not processed.")
+    # A worker claimed the job meanwhile; it may already be done
+    result_json = await run_in_threadpool(pop_verify_job_result, job_id)
+    if result_json is not None:
+        return TicketVerifyResponse.model_validate_json(result_json)
+    raise HTTPException(
+        status_code=504,
+        detail="Timed out waiting for a verify worker; the scan is still being processed and may redeem the ticket.",
+    )
+
+
 @app.post("/api/tickets/verify", response_model=TicketVerifyResponse)
-async def verify_ticket(check_in_code: Optional[str] = Form(None), file: UploadFile = File(...)):
+async def verify_ticket(
+    check_in_code: Optional[str] = Form(None),
+    file: UploadFile = File(...),
+    debug: Optional[bool] = Form(None),
+):
     now_ts = time.time()
+    include_debug_images = VERIFY_DEBUG_IMAGES if debug is None else debug
 
-    share_a_bytes = await file.read()
+    share_a_bytes = await read_limited(file)
+    check_image_pixels(share_a_bytes)
 
-    code_used = check_in_code or _extract_check_in_code(share_a_bytes)
+    code_used = check_in_code or await run_in_threadpool(extract_check_in_code, share_a_bytes)
     if not code_used:
         raise HTTPException(status_code=400, detail="Missing check-in code (could not read from image).")
 
-    last_attempt = _verify_attempts.get(code_used)
-    if last_attempt and now_ts - last_attempt < RATE_LIMIT_WINDOW:
-        raise HTTPException(
-            status_code=429,
-            detail="Too many verification attempts. Please wait a few seconds.",
-        )
-
-    with get_session() as session:
-        ticket = (
-            session.query(models.Ticket)
-            .filter(models.Ticket.check_in_code == code_used)
-            .one_or_none()
-        )
-    if ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-
-    _verify_attempts[code_used] = now_ts
-    share_b_bytes = ticket.share_b_blob
-    
-    # Default values
-    valid = False
-    message = "Verification failed"
-    decoded_payload = None
-    original_data = None
-    stacked_b64 = None
-    aligned_b64 = None
-    status = ticket.status
-
-    # 1. Stack Images
-    try:
-        stacked_img, aligned_img = robust_stack(share_a_bytes, share_b_bytes)
-        stacked_b64 = image_to_base64(stacked_img)
-        aligned_b64 = image_to_base64(aligned_img)
-    except Exception as exc:
-        return TicketVerifyResponse(
-            valid=False,
-            status=status,
-            message=f"Image alignment failed: {str(exc)}",
-            debug_image=None,
-            aligned_share_a=None
-        )
+    early = await run_in_threadpool(_check_ticket_before_verify, code_used, now_ts)
+    if early is not None:
+        return early
 
-    # 2. Decode QR
-    decoded_data = decode_qr_from_image(stacked_img)
-    original_data = decoded_data
-
-    if not decoded_data:
-        return TicketVerifyResponse(
-            valid=False,
-            status=status,
-            message="Could not decode QR code from stacked image",
-            debug_image=stacked_b64,
-            aligned_share_a=aligned_b64
-        )
+    if VERIFY_MODE == "queue":
+        return await _verify_via_queue(code_used, share_a_bytes, now_ts, include_debug_images)
+    return await run_in_threadpool(run_verification, code_used, share_a_bytes, now_ts, include_debug_images)
 
-    # 3. Verify Payload Signature
-    sig_ok, err_msg, parsed = _verify_payload(decoded_data)
-    decoded_payload = parsed
-    
-    if not sig_ok:
-        return TicketVerifyResponse(
-            valid=False,
-            status=status,
-            message=f"Invalid signature: {err_msg}",
-            debug_image=stacked_b64,
-            aligned_share_a=aligned_b64,
-            original_data=original_data,
-            decoded_payload=decoded_payload
-        )
 
-    if parsed and parsed["check_in_code"] != ticket.check_in_code:
-        return TicketVerifyResponse(
-            valid=False,
-            status=status,
-            message="Check-in code mismatch in payload",
-            debug_image=stacked_b64,
-            aligned_share_a=aligned_b64,
-            original_data=original_data,
-            decoded_payload=decoded_payload
-        )
+class BatchScan(NamedTuple):
+    index: int
+    name: str
+    data: bytes
+    check_in_code: Optional[str]
+    scanned_at: float
+    # Why the image was refused (format/size); reported on its own result line
+    error: Optional[str] = None
 
-    # 4. Check Ticket Status (Redeemed/Expired)
-    if ticket.status == "redeemed":
-        return TicketVerifyResponse(
-            valid=False,
-            status="redeemed",
-            message="Ticket has already been redeemed",
-            debug_image=stacked_b64,
-            aligned_share_a=aligned_b64,
-            original_data=original_data,
-            decoded_payload=decoded_payload
-        )
 
-    if ticket.expires_at:
+def _parse_batch_manifest(raw: Optional[str]) -> dict:
+    if not raw:
+        return {}
+    try:
+        manifest = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Manifest is not valid JSON.")
+    if not isinstance(manifest, dict):
+        raise HTTPException(status_code=400, detail="Manifest must map file names to scan info.")
+    return manifest
+
+
+async def _read_batch_scans(
+    files: List[UploadFile], archive: Optional[UploadFile], manifest_raw: Optional[str], now_ts: float
+) -> List[BatchScan]:
+    too_many = HTTPException(status_code=413, detail=f"Batch is limited to {VERIFY_BATCH_MAX_ITEMS} images.")
+    too_large = HTTPException(
+        status_code=413, detail=f"Batch exceeds {MAX_BATCH_UPLOAD_BYTES} bytes of (uncompressed) images."
+    )
+    if len(files) > VERIFY_BATCH_MAX_ITEMS:
+        raise too_many
+
+    # Everything read below stays in memory until the batch is done, so the
+    # multipart parts and zip entries share one uncompressed-byte budget.
+    budget = MAX_BATCH_UPLOAD_BYTES
+    named_images = []
+    for upload in files:
         try:
-            exp_ts = int(ticket.expires_at.timestamp())
-        except AttributeError:
-            exp_ts = None
-        if exp_ts and exp_ts < now_ts:
-            ticket.status = "expired"
-            with get_session() as session:
-                session.merge(ticket)
-                session.commit()
-            return TicketVerifyResponse(
-                valid=False,
-                status="expired",
-                message="Ticket has expired",
-                debug_image=stacked_b64,
-                aligned_share_a=aligned_b64,
-                original_data=original_data,
-                decoded_payload=decoded_payload
-            )
+            data = await read_limited(upload)
+        except HTTPException as exc:
+            # An oversized part fails only its own item
+            named_images.append((upload.filename or "", b"", exc.detail))
+            continue
+        budget -= len(data)
+        if budget < 0:
+            raise too_large
+        named_images.append((upload.filename or "", data, None))
+
+    if archive is not None:
+        if archive.size is not None and archive.size > MAX_BATCH_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Archive exceeds {MAX_BATCH_UPLOAD_BYTES} bytes.")
+        try:
+            # Read entries straight from the spooled upload instead of a second in-memory copy
+            with zipfile.ZipFile(archive.file) as zf:
+                manifest_entries = []
+                image_entries = []
+                for info in zf.infolist():
+                    if info.is_dir():
+                        continue
+                    basename = os.path.basename(info.filename)
+                    if basename == BATCH_MANIFEST_NAME:
+                        manifest_entries.append(info)
+                    # macOS resource forks (__MACOSX/, ._name) and other dotfiles aren't scans
+                    elif not (info.filename.startswith("__MACOSX/") or basename.startswith(".")):
+                        image_entries.append(info)
+                # The manifest form field wins; otherwise the shallowest manifest.json
+                manifest_entry = None
+                if manifest_entries and not manifest_raw:
+                    manifest_entry = min(manifest_entries, key=lambda info: info.filename.count("/"))
+
+                # Decide from the central directory before decompressing anything;
+                # zipfile never returns more than an entry's declared file_size.
+                if len(named_images) + len(image_entries) > VERIFY_BATCH_MAX_ITEMS:
+                    raise too_many
+                if manifest_entry is not None and manifest_entry.file_size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Archive entry {manifest_entry.filename} is too large.")
+                readable = [info for info in image_entries if info.file_size <= MAX_UPLOAD_BYTES]
+                if manifest_entry is not None:
+                    readable.append(manifest_entry)
+                if sum(info.file_size for info in readable) > budget:
+                    raise too_large
+
+                if manifest_entry is not None:
+                    manifest_raw = zf.read(manifest_entry).decode("utf-8")
+                for info in image_entries:
+                    if info.file_size > MAX_UPLOAD_BYTES:
+                        named_images.append((info.filename, b"", f"Archive entry exceeds {MAX_UPLOAD_BYTES} bytes."))
+                    else:
+                        named_images.append((info.filename, zf.read(info), None))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Archive is not a valid zip file.")
+
+    manifest = _parse_batch_manifest(manifest_raw)
+    scans = []
+    for index, (name, data, error) in enumerate(named_images):
+        info = manifest.get(name) or {}
+        try:
+            # Client clocks are untrusted: a scan can't be dated after the upload
+            scanned_at = min(float(info.get("scanned_at", now_ts)), now_ts)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid scanned_at for {name}.")
+        if error is None:
+            try:
+                check_image_pixels(data)
+            except HTTPException as exc:
+                data, error = b"", exc.detail
+        scans.append(BatchScan(index, name, data, info.get("check_in_code"), scanned_at, error))
+    return scans
+
+
+def _batch_result(scan: BatchScan, result: TicketVerifyResponse) -> dict:
+    return {
+        "index": scan.index,
+        "name": scan.name,
+        "check_in_code": scan.check_in_code,
+        "scanned_at": scan.scanned_at,
+        **result.model_dump(exclude={"debug_image", "aligned_share_a"}),
+    }
 
-    # 5. Success
-    status = "redeemed"
-    ticket.status = "redeemed"
-    ticket.redeemed_at = datetime.utcfromtimestamp(now_ts)
-    with get_session() as session:
-        session.merge(ticket)
-        session.commit()
 
-    return TicketVerifyResponse(
-        valid=True,
-        original_data=decoded_data,
-        debug_image=stacked_b64,
-        aligned_share_a=aligned_b64,
-        status=status,
-        message="Ticket is valid and authentic",
-        decoded_payload=decoded_payload,
-        confidence=1.0
+def _verify_scan_group(ticket, scans: List[BatchScan]) -> List[dict]:
+    """
+    All batch scans of one ticket (a Ticket or TicketArchive row), in
+    client-timestamp order: the earliest authentic scan redeems the ticket
+    (dated at its scan time); later scans are reported as already redeemed
+    without any image work. Expiry is decided only by scan time, so a scan
+    made before expires_at redeems even if the sweeper has since expired
+    or archived the ticket.
+    """
+    results = []
+    redeemed = ticket.status == "redeemed"
+    for scan in scans:
+        if redeemed:
+            result = TicketVerifyResponse(valid=False, status="redeemed", message="Ticket has already been redeemed")
+        elif is_past_expiry(ticket.expires_at, scan.scanned_at):
+            result = expired_response()
+        else:
+            result = evaluate_share(ticket, scan.data, scan.scanned_at, include_debug_images=False)
+            if result.valid:
+                redeemed = True
+                if not redeem_ticket(ticket.id, scan.scanned_at, type(ticket)):
+                    # Redeemed online (or by another batch) since the lookup
+                    result = result.model_copy(
+                        update={"valid": False, "message": "Ticket has already been redeemed", "confidence": 0.0}
+                    )
+        results.append(_batch_result(scan, result))
+    return results
+
+
+def _load_batch_tickets(codes: set) -> dict:
+    """Ticket rows by code; codes only found in tickets_archive map to their latest archived row."""
+    with get_session() as session:
+        tickets = {
+            ticket.check_in_code: ticket
+            for ticket in session.query(models.Ticket).filter(models.Ticket.check_in_code.in_(codes))
+        }
+        archived = (
+            session.query(models.TicketArchive)
+            .options(defer(models.TicketArchive.share_b_features))
+            .filter(models.TicketArchive.check_in_code.in_(codes - tickets.keys()))
+            .order_by(models.TicketArchive.id)
+        )
+        for row in archived:
+            tickets[row.check_in_code] = row
+    return tickets
+
+
+@app.post("/api/tickets/verify/batch")
+async def verify_ticket_batch(
+    files: List[UploadFile] = File([]),
+    archive: Optional[UploadFile] = File(None),
+    manifest: Optional[str] = Form(None),
+):
+    """
+    Verify many Share A scans at once (e.g. uploaded by a gate after working
+    offline). Send images as repeated `files` parts and/or one zip `archive`;
+    `manifest` (or manifest.json in the zip) maps file names to
+    {"check_in_code", "scanned_at"}. Results stream back as NDJSON, one line
+    per image, as each ticket finishes; an image refused for its format or
+    size gets an error line instead of failing the batch. No per-code rate
+    limit applies.
+    """
+    now_ts = time.time()
+    scans = await _read_batch_scans(files, archive, manifest, now_ts)
+    if not scans:
+        raise HTTPException(status_code=400, detail="No images in batch.")
+
+    loop = asyncio.get_running_loop()
+    missing = [scan for scan in scans if not scan.check_in_code and scan.error is None]
+    codes = await asyncio.gather(
+        *(loop.run_in_executor(_batch_executor, extract_check_in_code, scan.data) for scan in missing)
     )
+    for scan, code in zip(missing, codes):
+        scans[scan.index] = scan._replace(check_in_code=code)
+
+    referenced = {scan.check_in_code for scan in scans if scan.check_in_code}
+    tickets = await run_in_threadpool(_load_batch_tickets, referenced)
+
+    immediate = []
+    groups = defaultdict(list)
+    for scan in sorted(scans, key=lambda s: (s.scanned_at, s.index)):
+        if scan.error is not None:
+            result = TicketVerifyResponse(valid=False, status="error", message=scan.error)
+        elif not scan.check_in_code:
+            result = TicketVerifyResponse(
+                valid=False, status="unknown", message="Missing check-in code (could not read from image)."
+            )
+        elif scan.check_in_code in tickets:
+            groups[scan.check_in_code].append(scan)
+            continue
+        else:
+            result = TicketVerifyResponse(valid=False, status="not_found", message="Ticket not found")
+        immediate.append(_batch_result(scan, result))
+
+    async def _stream():
+        pending = [
+            loop.run_in_executor(_batch_executor, _verify_scan_group, tickets[code], group)
+            for code, group in groups.items()
+        ]
+        for item in immediate:
+            yield json.dumps(item) + "\n"
+        for finished in asyncio.as_completed(pending):
+            for item in await finished:
+                yield json.dumps(item) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
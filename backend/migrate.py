@@ -3,10 +3,14 @@ import os
 
 from sqlalchemy import text
 
-from database import engine
+import models  # noqa: F401  (registers tables on Base.metadata)
+from database import Base, engine
 
 
 def run_migrations():
+    # Create missing tables here rather than on every API worker boot.
+    Base.metadata.create_all(bind=engine)
+
     migrations = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "migrations", "*.sql")))
     if not migrations:
         print("No migrations found.")
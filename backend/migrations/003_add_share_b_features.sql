@@ -0,0 +1,2 @@
+-- Precomputed ORB keypoints/descriptors for Share B (see backfill_features.py)
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS share_b_features BYTEA;
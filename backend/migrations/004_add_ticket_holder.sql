@@ -0,0 +1,3 @@
+-- Personal data moves out of the QR payload (compact format) into the ticket row
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS holder_name VARCHAR(255);
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS holder_email VARCHAR(255);
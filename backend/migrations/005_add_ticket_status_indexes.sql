@@ -0,0 +1,4 @@
+-- Partial indexes for the expiry sweeper and archiver (see sweeper.py).
+-- tickets_archive itself is created by migrate.py's create_all.
+CREATE INDEX IF NOT EXISTS ix_tickets_active_expires_at ON tickets (expires_at) WHERE status = 'active';
+CREATE INDEX IF NOT EXISTS ix_tickets_inactive_expires_at ON tickets (expires_at) WHERE status <> 'active';
@@ -0,0 +1,2 @@
+-- Per-job opt-in for the stacked/aligned debug images (VERIFY_DEBUG_IMAGES / `debug` form field)
+ALTER TABLE verify_jobs ADD COLUMN IF NOT EXISTS include_debug_images BOOLEAN NOT NULL DEFAULT FALSE;
@@ -1,6 +1,8 @@
 import datetime as dt
 
-from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, LargeBinary, String, Text, text
+
+from sqlalchemy.orm import deferred
 
 from database import Base
 
@@ -11,8 +13,73 @@ class Ticket(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_uuid = Column(String(64), unique=True, nullable=False, index=True)
     check_in_code = Column(String(16), unique=True, nullable=False, index=True)
+    holder_name = Column(String(255), nullable=True)
+    holder_email = Column(String(255), nullable=True)
     share_b_blob = Column(LargeBinary, nullable=False)
+    # Only the last-resort ORB strategy reads this; loaded on demand
+    share_b_features = deferred(Column(LargeBinary, nullable=True))
     created_at = Column(DateTime, default=dt.datetime.utcnow)
     expires_at = Column(DateTime, nullable=True)
     status = Column(String(32), default="active", nullable=False)
     redeemed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Sweeper: active tickets past expiry. Archiver: finished tickets past expiry.
+        Index(
+            "ix_tickets_active_expires_at",
+            "expires_at",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+        Index(
+            "ix_tickets_inactive_expires_at",
+            "expires_at",
+            postgresql_where=text("status <> 'active'"),
+            sqlite_where=text("status <> 'active'"),
+        ),
+    )
+
+
+class TicketArchive(Base):
+    """Cold storage for redeemed/expired tickets moved out of `tickets` by sweeper.py."""
+
+    __tablename__ = "tickets_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_uuid = Column(String(64), nullable=False)
+    check_in_code = Column(String(16), nullable=False, index=True)
+    holder_name = Column(String(255), nullable=True)
+    holder_email = Column(String(255), nullable=True)
+    share_b_blob = Column(LargeBinary, nullable=False)
+    share_b_features = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    status = Column(String(32), nullable=False)
+    redeemed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
+
+
+class VerifyAttempt(Base):
+    """Last verify attempt per check-in code; shared rate-limit state across API processes."""
+
+    __tablename__ = "verify_attempts"
+
+    check_in_code = Column(String(16), primary_key=True)
+    last_attempt_at = Column(Float, nullable=False)
+
+
+class VerifyJob(Base):
+    """Verify request handed from an API process to the verify worker pool."""
+
+    __tablename__ = "verify_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    check_in_code = Column(String(16), nullable=False)
+    share_a_blob = Column(LargeBinary, nullable=False)
+    submitted_at = Column(Float, nullable=False)
+    include_debug_images = Column(Boolean, default=False, nullable=False)
+    status = Column(String(16), default="pending", nullable=False, index=True)
+    worker_id = Column(String(64), nullable=True)
+    claimed_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    result_json = Column(Text, nullable=True)
@@ -0,0 +1,330 @@
+"""
+Offline verification bundle for gate devices with unreliable connectivity.
+
+  export     write every active, unexpired ticket into one indexed bundle file
+  verify     verify Share A images against the bundle, logging redemptions locally
+  reconcile  apply one or more local redemption logs to the server database
+
+Run:
+  uv run python offline_bundle.py export --out tickets.vcsb
+  SIGNING_SECRET=... uv run python offline_bundle.py verify --bundle tickets.vcsb \\
+      --log redemptions.jsonl --gate gate-1 share_a.png
+  uv run python offline_bundle.py reconcile gate-1.jsonl gate-2.jsonl
+
+Bundle layout (little-endian):
+  header   magic "VCSB", version, ticket count, export time, index offset
+  records  packed Share B PNG + alignment features per ticket
+  index    fixed-size entries sorted by check-in code (code, uuid, expiry,
+           record offsets/lengths), binary-searched in place
+
+The verifier memory-maps the file and only touches the index entries it
+searches plus the one record it needs, so bundle size doesn't drive memory use.
+Verification needs the same SIGNING_SECRET as the server (environment or
+.env); `verify` refuses to run without it. It imports no FastAPI/DB code.
+"""
+
+import argparse
+import calendar
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+BUNDLE_MAGIC = b"VCSB"
+BUNDLE_VERSION = 1
+_HEADER = struct.Struct("<4sHIqQ")  # magic, version, count, exported_at, index_offset
+_ENTRY = struct.Struct("<16s36sqQIQI")  # code, uuid, expires_at, share_b off/len, features off/len
+_CODE_LEN = 16
+
+
+class BundleRecord(NamedTuple):
+    check_in_code: str
+    user_uuid: str
+    expires_at: Optional[int]
+    share_b_blob: bytes
+    share_b_features: Optional[bytes]
+
+
+def _code_key(code: str) -> bytes:
+    return code.encode("ascii").ljust(_CODE_LEN, b"\0")
+
+
+def export_bundle(out_path: str, batch_size: int = 200) -> int:
+    """Write all active, unexpired tickets to out_path. Returns the number exported."""
+    from sqlalchemy.orm import undefer
+
+    import models
+    from database import get_session
+
+    now = datetime.utcnow()
+    entries = []
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as out, get_session() as session:
+        out.write(b"\0" * _HEADER.size)
+        query = (
+            session.query(models.Ticket)
+            .options(undefer(models.Ticket.share_b_features))
+            .filter(models.Ticket.status == "active")
+            .filter((models.Ticket.expires_at.is_(None)) | (models.Ticket.expires_at > now))
+            .yield_per(batch_size)
+        )
+        for ticket in query:
+            share_b_offset = out.tell()
+            out.write(ticket.share_b_blob)
+            features = ticket.share_b_features or b""
+            features_offset = out.tell()
+            out.write(features)
+            # expires_at is stored as naive UTC
+            expires_at = calendar.timegm(ticket.expires_at.utctimetuple()) if ticket.expires_at else 0
+            entries.append(
+                (
+                    _code_key(ticket.check_in_code),
+                    ticket.user_uuid.encode("ascii"),
+                    expires_at,
+                    share_b_offset,
+                    len(ticket.share_b_blob),
+                    features_offset,
+                    len(features),
+                )
+            )
+
+        entries.sort(key=lambda e: e[0])
+        index_offset = out.tell()
+        for entry in entries:
+            out.write(_ENTRY.pack(*entry))
+
+        out.seek(0)
+        out.write(_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(entries), int(time.time()), index_offset))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, out_path)
+    return len(entries)
+
+
+class OfflineBundle:
+    """Read-only, memory-mapped view of a bundle written by export_bundle."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.exported_at, self._index_offset = _HEADER.unpack_from(self._mm, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} ticket bundle")
+
+    def close(self) -> None:
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _key_at(self, i: int) -> bytes:
+        pos = self._index_offset + i * _ENTRY.size
+        return self._mm[pos : pos + _CODE_LEN]
+
+    def lookup(self, check_in_code: str) -> Optional[BundleRecord]:
+        try:
+            key = _code_key(check_in_code)
+        except UnicodeEncodeError:
+            return None
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo >= self.count or self._key_at(lo) != key:
+            return None
+
+        _, user_uuid, expires_at, b_off, b_len, f_off, f_len = _ENTRY.unpack_from(
+            self._mm, self._index_offset + lo * _ENTRY.size
+        )
+        return BundleRecord(
+            check_in_code=check_in_code,
+            user_uuid=user_uuid.decode("ascii"),
+            expires_at=expires_at or None,
+            share_b_blob=self._mm[b_off : b_off + b_len],
+            share_b_features=self._mm[f_off : f_off + f_len] or None,
+        )
+
+
+class RedemptionLog:
+    """Append-only JSONL log of local redemptions, fsync'd per entry."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.redeemed = {entry["check_in_code"] for entry in read_redemption_log(path)} if os.path.exists(path) else set()
+
+    def append(self, check_in_code: str, user_uuid: str, redeemed_at: float, gate_id: str) -> None:
+        entry = {
+            "check_in_code": check_in_code,
+            "user_uuid": user_uuid,
+            "redeemed_at": redeemed_at,
+            "gate_id": gate_id,
+        }
+        with open(self.path, "a", encoding="utf-8") as log:
+            log.write(json.dumps(entry) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+        self.redeemed.add(check_in_code)
+
+
+def read_redemption_log(path: str) -> Iterable[dict]:
+    with open(path, "r", encoding="utf-8") as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
+def verify_offline(
+    bundle: OfflineBundle,
+    log: RedemptionLog,
+    share_a_bytes: bytes,
+    check_in_code: Optional[str] = None,
+    gate_id: str = "gate",
+    now_ts: Optional[float] = None,
+) -> dict:
+    """Offline counterpart of the verify endpoint; returns valid/status/message/decoded_payload."""
+    from core_crypto import extract_check_in_code, stack_and_decode
+    from ticket_payload import verify_payload
+
+    now_ts = now_ts or time.time()
+    code = check_in_code or extract_check_in_code(share_a_bytes)
+    if not code:
+        return {"valid": False, "status": "unknown", "message": "Missing check-in code (could not read from image)."}
+
+    record = bundle.lookup(code)
+    if record is None:
+        return {"valid": False, "status": "not_found", "message": "Ticket not in offline bundle"}
+    if code in log.redeemed:
+        return {"valid": False, "status": "redeemed", "message": "Ticket has already been redeemed at this gate"}
+    if record.expires_at and record.expires_at < now_ts:
+        return {"valid": False, "status": "expired", "message": "Ticket has expired"}
+
+    try:
+        decoded, _, _ = stack_and_decode(share_a_bytes, record.share_b_blob, record.share_b_features)
+    except Exception as exc:
+        return {"valid": False, "status": "active", "message": f"Image alignment failed: {exc}"}
+    if not decoded:
+        return {"valid": False, "status": "active", "message": "Could not decode QR code from stacked image"}
+
+    sig_ok, err_msg, parsed = verify_payload(decoded)
+    if not sig_ok:
+        return {"valid": False, "status": "active", "message": f"Invalid signature: {err_msg}", "decoded_payload": parsed}
+    if parsed["check_in_code"] != code or parsed["user_uuid"] != record.user_uuid:
+        return {"valid": False, "status": "active", "message": "Payload does not match ticket", "decoded_payload": parsed}
+
+    log.append(code, record.user_uuid, now_ts, gate_id)
+    return {"valid": True, "status": "redeemed", "message": "Ticket is valid and authentic", "decoded_payload": parsed}
+
+
+def reconcile(log_paths: Iterable[str]) -> dict:
+    """
+    Apply local redemptions to the server in one transaction. Entries from all
+    logs are ordered by scan time so the earliest scan of a ticket wins; later
+    ones (or tickets already redeemed online) are reported as conflicts.
+    Expiry is judged at scan time: a scan made before expires_at still redeems
+    a ticket the sweeper has since expired or moved to tickets_archive.
+    """
+    import models
+    from database import get_session
+    from verification import redeemable
+
+    entries = sorted(
+        (entry for path in log_paths for entry in read_redemption_log(path)),
+        key=lambda e: e["redeemed_at"],
+    )
+    summary = {"applied": 0, "conflicts": [], "not_found": []}
+    with get_session() as session:
+        codes = {e["check_in_code"] for e in entries}
+        rows = {
+            code: (models.Ticket, ticket_id)
+            for code, ticket_id in session.query(models.Ticket.check_in_code, models.Ticket.id).filter(
+                models.Ticket.check_in_code.in_(codes)
+            )
+        }
+        # Codes no longer in tickets: their latest archived row
+        archived = (
+            session.query(models.TicketArchive.check_in_code, models.TicketArchive.id)
+            .filter(models.TicketArchive.check_in_code.in_(codes - rows.keys()))
+            .order_by(models.TicketArchive.id)
+        )
+        for code, ticket_id in archived:
+            rows[code] = (models.TicketArchive, ticket_id)
+
+        for entry in entries:
+            if entry["check_in_code"] not in rows:
+                summary["not_found"].append(entry)
+                continue
+            model, ticket_id = rows[entry["check_in_code"]]
+            redeemed_at = datetime.utcfromtimestamp(entry["redeemed_at"])
+            updated = (
+                session.query(model)
+                .filter(*redeemable(model, ticket_id, redeemed_at))
+                .update(
+                    {"status": "redeemed", "redeemed_at": redeemed_at},
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                summary["applied"] += 1
+            else:
+                summary["conflicts"].append(entry)
+        session.commit()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="write active tickets to a bundle file")
+    export_cmd.add_argument("--out", required=True)
+
+    verify_cmd = sub.add_parser("verify", help="verify Share A images against a bundle")
+    verify_cmd.add_argument("--bundle", required=True)
+    verify_cmd.add_argument("--log", required=True, help="local redemption log (JSONL)")
+    verify_cmd.add_argument("--gate", default=os.getenv("GATE_ID", "gate"))
+    verify_cmd.add_argument("--code", help="check-in code, if not read from the image")
+    verify_cmd.add_argument("images", nargs="+")
+
+    reconcile_cmd = sub.add_parser("reconcile", help="apply redemption logs to the server DB")
+    reconcile_cmd.add_argument("logs", nargs="+")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        count = export_bundle(args.out)
+        print(f"Exported {count} tickets to {args.out}")
+    elif args.command == "verify":
+        from ticket_payload import SIGNING_SECRET_IS_DEFAULT
+
+        if SIGNING_SECRET_IS_DEFAULT:
+            # Every genuine ticket would fail as "Signature mismatch"
+            parser.error("SIGNING_SECRET is not set; use the server's signing secret to verify tickets")
+        log = RedemptionLog(args.log)
+        with OfflineBundle(args.bundle) as bundle:
+            for path in args.images:
+                with open(path, "rb") as f:
+                    result = verify_offline(bundle, log, f.read(), args.code, args.gate)
+                print(json.dumps({"file": path, **result}))
+    else:
+        summary = reconcile(args.logs)
+        print(
+            f"Applied {summary['applied']} redemptions, "
+            f"{len(summary['conflicts'])} conflicts, {len(summary['not_found'])} unknown codes"
+        )
+        for entry in summary["conflicts"]:
+            print(f"  conflict: {json.dumps(entry)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
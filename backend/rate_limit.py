@@ -0,0 +1,53 @@
+"""
+Per-check-in-code verify rate limit, shared by every API process through the
+verify_attempts table. Rows older than RATE_LIMIT_WINDOW no longer limit
+anything; the expiry sweeper deletes them (purge_verify_attempts) so the
+table only holds codes scanned recently.
+"""
+
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import get_session
+
+RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "3"))
+
+
+def acquire_verify_slot(session, code: str, now_ts: float) -> bool:
+    """
+    Per-code rate limit shared by every API process. The conditional UPDATE
+    (or the INSERT for a first attempt) is atomic, so two processes can't both
+    pass for the same code inside one window.
+    """
+    updated = (
+        session.query(models.VerifyAttempt)
+        .filter(
+            models.VerifyAttempt.check_in_code == code,
+            models.VerifyAttempt.last_attempt_at <= now_ts - RATE_LIMIT_WINDOW,
+        )
+        .update({"last_attempt_at": now_ts}, synchronize_session=False)
+    )
+    if updated:
+        session.commit()
+        return True
+    try:
+        session.add(models.VerifyAttempt(check_in_code=code, last_attempt_at=now_ts))
+        session.commit()
+        return True
+    except IntegrityError:
+        session.rollback()
+        return False
+
+
+def purge_verify_attempts(now_ts: Optional[float] = None, window: float = RATE_LIMIT_WINDOW) -> int:
+    """Delete attempts older than the rate-limit window. Returns rows deleted."""
+    cutoff = (now_ts or time.time()) - window
+    with get_session() as session:
+        result = session.execute(delete(models.VerifyAttempt).where(models.VerifyAttempt.last_attempt_at < cutoff))
+        session.commit()
+        return result.rowcount
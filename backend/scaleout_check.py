@@ -0,0 +1,233 @@
+"""
+Single-host check for the queue topology (VERIFY_MODE=queue + verify_worker.py).
+
+Creates tickets in a scratch SQLite database, enqueues every scan several
+times back to back (so copies of the same ticket are claimed concurrently by
+different workers), then drains the queue with 1, 2, 4... worker processes.
+
+Checks, per worker count:
+  - every ticket ends up redeemed, with exactly one valid result per ticket
+    (the canonical path is deterministic, so a ticket that never decodes fails)
+  - no job failed
+  - speedup relative to the first worker count is at least 0.7x the ratio of
+    worker counts (skipped when the host has fewer CPUs than workers)
+
+Then one pass through the API endpoint with VERIFY_MODE=queue: a scan with no
+worker running times out with 504 and its job is cancelled, an immediate retry
+is rate limited with 429, and a scan with a worker running redeems the ticket.
+
+Run:
+  SIGNING_SECRET=test-secret uv run python scaleout_check.py --tickets 16 --workers 1 2 4
+"""
+
+import argparse
+import base64
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Minimum speedup per added worker, relative to linear scaling
+SPEEDUP_FLOOR = 0.7
+
+
+def _rotate_png(png_bytes: bytes) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(png_bytes)).rotate(90, expand=True).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _reset_scratch_db():
+    import models
+    from database import get_session
+
+    with get_session() as session:
+        session.query(models.VerifyJob).delete()
+        session.query(models.VerifyAttempt).delete()
+        session.query(models.Ticket).update({"status": "active", "redeemed_at": None})
+        session.commit()
+
+
+def _check_api_path(scans, ctx) -> bool:
+    """Drive POST /api/tickets/verify in queue mode: timeout/cancel, rate limit, and a queued redeem."""
+    from fastapi.testclient import TestClient
+
+    import main as api
+    import models
+    from database import get_session
+    from verify_worker import run_worker
+
+    _reset_scratch_db()
+    client = TestClient(api.app)
+
+    def verify(code, share_a):
+        return client.post("/api/tickets/verify", data={"check_in_code": code}, files={"file": ("scan.png", share_a)})
+
+    def report(label, passed, response):
+        print(f"  {label}: {'ok' if passed else 'FAILED'} ({response.status_code} {response.text[:120]})")
+        return passed
+
+    def ticket_status(code):
+        with get_session() as session:
+            return session.query(models.Ticket.status).filter(models.Ticket.check_in_code == code).scalar()
+
+    def job_count():
+        with get_session() as session:
+            return session.query(models.VerifyJob).count()
+
+    ok = True
+    code, share_a = scans[0]
+    timeout = api.VERIFY_JOB_TIMEOUT
+    api.VERIFY_JOB_TIMEOUT = 1.0
+    try:
+        response = verify(code, share_a)
+    finally:
+        api.VERIFY_JOB_TIMEOUT = timeout
+    ok &= report(
+        "no worker -> 504, job cancelled",
+        response.status_code == 504
+        and "not processed" in response.json()["detail"]
+        and job_count() == 0
+        and ticket_status(code) == "active",
+        response,
+    )
+
+    response = verify(code, share_a)
+    ok &= report("immediate retry -> 429", response.status_code == 429, response)
+
+    code, share_a = scans[1]
+    worker = ctx.Process(target=run_worker, args=("check-api",))
+    worker.start()
+    try:
+        response = verify(code, share_a)
+    finally:
+        worker.terminate()
+        worker.join()
+    ok &= report(
+        "worker running -> redeemed",
+        response.status_code == 200
+        and response.json()["valid"]
+        and ticket_status(code) == "redeemed"
+        and job_count() == 0,
+        response,
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=16, help="at least 2, for the API pass")
+    parser.add_argument("--duplicates", type=int, default=2, help="extra scans per ticket")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument(
+        "--rotated",
+        action="store_true",
+        help="rotate Share A by 90 degrees so every job takes the ArUco path instead of the canonical fast path",
+    )
+    args = parser.parse_args()
+    if args.tickets < 2:
+        parser.error("--tickets must be at least 2")
+
+    # Must be set before database.py is imported (here and in the spawned workers)
+    db_dir = tempfile.mkdtemp(prefix="vcs-scaleout-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'tickets.sqlite3')}"
+    os.environ.setdefault("SIGNING_SECRET", "test-secret")
+    os.environ["VERIFY_MODE"] = "queue"
+    os.environ["RATE_LIMIT_WINDOW"] = "10"
+    os.environ["WARM_UP_ON_STARTUP"] = "0"
+
+    import models
+    from database import Base, engine, get_session
+    from main import TicketCreateRequest, create_ticket
+    from verify_queue import enqueue_verify_job
+    from verify_worker import run_worker
+
+    Base.metadata.create_all(bind=engine)
+
+    print(f"Creating {args.tickets} tickets in {db_dir} ...")
+    scans = []
+    for i in range(args.tickets):
+        created = create_ticket(TicketCreateRequest(name=f"Guest {i}", email=f"guest{i}@example.com"))
+        share_a = base64.b64decode(created.share_a_base64)
+        scans.append((created.check_in_code, _rotate_png(share_a) if args.rotated else share_a))
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    ok = True
+    for worker_count in args.workers:
+        _reset_scratch_db()
+
+        for code, share_a in scans:
+            for _ in range(1 + args.duplicates):
+                enqueue_verify_job(code, share_a, submitted_at=time.time())
+
+        processes = [
+            ctx.Process(target=run_worker, args=(f"check-{worker_count}-{i}",), kwargs={"stop_when_idle": True})
+            for i in range(worker_count)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        with get_session() as session:
+            jobs = session.query(models.VerifyJob).all()
+            statuses = {t.check_in_code: t.status for t in session.query(models.Ticket).all()}
+
+        valid_per_code = defaultdict(int)
+        failed = 0
+        for job in jobs:
+            failed += job.status != "done"
+            result = json.loads(job.result_json) if job.result_json else {}
+            if result.get("valid"):
+                valid_per_code[job.check_in_code] += 1
+
+        undecodable = sorted(code for code, _ in scans if statuses[code] != "redeemed")
+        correct = (
+            len(jobs) == len(scans) * (1 + args.duplicates)
+            and failed == 0
+            and not undecodable
+            and all(valid_per_code[code] == 1 for code, _ in scans)
+        )
+        ok = ok and correct
+        if undecodable:
+            print(f"  {len(undecodable)} ticket(s) not redeemed with {worker_count} worker(s): {undecodable}")
+
+        # Measure from first claim to last completion so process spawn/import time is excluded
+        elapsed = max(j.finished_at for j in jobs) - min(j.claimed_at for j in jobs)
+        rows.append((worker_count, len(jobs), elapsed, correct, len({j.worker_id for j in jobs})))
+
+    cpu_count = os.cpu_count() or 1
+    base_workers, base_rate = rows[0][0], rows[0][1] / rows[0][2]
+    print(f"\n=== Scale-out check (cpu_count={cpu_count}, rotated={args.rotated}) ===")
+    print(f"{'workers':>7} {'jobs':>5} {'seconds':>8} {'jobs/s':>8} {'speedup':>8} {'active':>7}  correct  scaling")
+    for worker_count, job_count, elapsed, correct, active in rows:
+        rate = job_count / elapsed
+        speedup = rate / base_rate
+        if worker_count <= base_workers:
+            scaling = "-"
+        elif cpu_count < worker_count:
+            scaling = f"skipped (cpu_count < {worker_count})"
+        elif speedup >= SPEEDUP_FLOOR * worker_count / base_workers:
+            scaling = "ok"
+        else:
+            scaling = f"LOW (< {SPEEDUP_FLOOR * worker_count / base_workers:.2f}x)"
+            ok = False
+        print(
+            f"{worker_count:>7} {job_count:>5} {elapsed:>8.2f} {rate:>8.1f} "
+            f"{speedup:>7.2f}x {active:>7}  {'yes' if correct else 'NO':<7}  {scaling}"
+        )
+
+    print("\n=== API path (VERIFY_MODE=queue) ===")
+    api_ok = _check_api_path(scans, ctx)
+    sys.exit(0 if ok and api_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Startup profile for API workers: import-time breakdown of `main` plus the
+cost of the warm-up hook.
+
+Run:
+  uv run python startup_profile.py [--top 15]
+
+Imports are timed in a fresh interpreter with `python -X importtime`, so the
+numbers reflect a cold worker rather than this process.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules worth calling out individually even when they're nested under another import.
+HEAVY_MODULES = ("fastapi", "sqlalchemy", "pydantic", "numpy", "cv2", "PIL.Image", "qrcode", "pyzbar.pyzbar")
+
+
+def _parse_importtime(stderr: str):
+    """Yield (depth, self_us, cumulative_us, module) from -X importtime output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2]
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        yield depth, self_us, cumulative_us, name.strip()
+
+
+WARM_UP_MARKER = "--- warm_up ---"
+
+
+def profile_imports(module: str = "main"):
+    code = (
+        "import sys, time; t = time.perf_counter(); "
+        f"import {module}; "
+        "s = time.perf_counter(); "
+        f"print({WARM_UP_MARKER!r}, file=sys.stderr, flush=True); "
+        f"{module}.warm_up(); "
+        "e = time.perf_counter(); "
+        "print(f'{(s - t) * 1000:.1f} {(e - s) * 1000:.1f}')"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_ms, warm_up_ms = (float(v) for v in result.stdout.split())
+    import_log, _, warm_up_log = result.stderr.partition(WARM_UP_MARKER)
+    return list(_parse_importtime(import_log)), list(_parse_importtime(warm_up_log)), import_ms, warm_up_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    entries, warm_up_entries, import_ms, warm_up_ms = profile_imports(args.module)
+    by_name = {}
+    for _, self_us, cumulative_us, name in entries:
+        by_name.setdefault(name, (self_us, cumulative_us))
+
+    print(f"=== Startup profile: import {args.module} ===")
+    print(f"Wall-clock import:  {import_ms:8.1f} ms")
+    print(f"warm_up():          {warm_up_ms:8.1f} ms")
+
+    print(f"\nHeavy dependencies loaded by import {args.module} (cumulative):")
+    for name in HEAVY_MODULES:
+        if name in by_name:
+            print(f"  {name:<24} {by_name[name][1] / 1000:8.1f} ms")
+        else:
+            print(f"  {name:<24} {'lazy':>11}")
+
+    print(f"\nTop-level imports of {args.module} (cumulative):")
+    direct = [e for e in entries if e[0] == 1]
+    for _, _, cumulative_us, name in sorted(direct, key=lambda e: e[2], reverse=True)[: args.top]:
+        print(f"  {name:<40} {cumulative_us / 1000:8.1f} ms")
+
+    print("\nTop modules by self time:")
+    for _, self_us, _, name in sorted(entries, key=lambda e: e[1], reverse=True)[: args.top]:
+        print(f"  {name:<40} {self_us / 1000:8.1f} ms")
+
+    print("\nLazy imports pulled in by warm_up():")
+    for _, _, cumulative_us, name in [e for e in warm_up_entries if e[0] == 0][: args.top]:
+        print(f"  {name:<40} {cumulative_us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Expiry sweeper and archiver for the tickets table.
+
+  - expire: active tickets past `expires_at` are marked 'expired' in chunks
+  - archive: redeemed/expired tickets whose expiry is older than
+    TICKET_ARCHIVE_AFTER_SECONDS move (with their Share B) to tickets_archive
+  - verify jobs: abandoned verify_jobs rows are purged (verify_queue.purge_verify_jobs)
+  - rate limit: verify_attempts rows older than RATE_LIMIT_WINDOW are deleted
+
+API processes run this on a background thread every EXPIRY_SWEEP_INTERVAL
+seconds (see main.on_startup), so several processes may sweep at once:
+expiry is a conditional update; the archiver locks the rows it moves with
+FOR UPDATE SKIP LOCKED on Postgres (concurrent archivers take disjoint
+chunks; SQLite serialises writers anyway) and never copies an id already
+in tickets_archive.
+
+Run once (e.g. from cron, with EXPIRY_SWEEP_INTERVAL=0 on the API):
+  uv run python sweeper.py [--archive-after SECONDS]
+"""
+
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, exists, insert, select, update
+
+import models
+from database import get_session
+from rate_limit import purge_verify_attempts
+from verify_queue import purge_verify_jobs
+
+EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", "60"))
+TICKET_ARCHIVE_AFTER_SECONDS = int(os.getenv("TICKET_ARCHIVE_AFTER_SECONDS", "0"))  # 0 = keep rows
+SWEEP_CHUNK_SIZE = int(os.getenv("SWEEP_CHUNK_SIZE", "500"))
+
+_ARCHIVED_COLUMNS = [
+    "id",
+    "user_uuid",
+    "check_in_code",
+    "holder_name",
+    "holder_email",
+    "share_b_blob",
+    "share_b_features",
+    "created_at",
+    "expires_at",
+    "status",
+    "redeemed_at",
+]
+
+logger = logging.getLogger("sweeper")
+
+
+def expire_tickets(now: Optional[datetime] = None, chunk_size: int = SWEEP_CHUNK_SIZE) -> int:
+    """Mark active tickets past expiry as expired, one chunk per transaction. Returns rows updated."""
+    now = now or datetime.utcnow()
+    total = 0
+    while True:
+        with get_session() as session:
+            ids = session.scalars(
+                select(models.Ticket.id)
+                .where(models.Ticket.status == "active", models.Ticket.expires_at < now)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return total
+            result = session.execute(
+                update(models.Ticket)
+                .where(models.Ticket.id.in_(ids), models.Ticket.status == "active")
+                .values(status="expired")
+            )
+            session.commit()
+        total += result.rowcount
+        if len(ids) < chunk_size:
+            return total
+
+
+def archive_tickets(cutoff: datetime, chunk_size: int = SWEEP_CHUNK_SIZE) -> int:
+    """Move redeemed/expired tickets that expired before cutoff to tickets_archive. Returns rows moved."""
+    ticket_columns = [getattr(models.Ticket, name) for name in _ARCHIVED_COLUMNS]
+    already_archived = exists().where(models.TicketArchive.id == models.Ticket.id)
+    total = 0
+    while True:
+        with get_session() as session:
+            ids = session.scalars(
+                select(models.Ticket.id)
+                .where(models.Ticket.status != "active", models.Ticket.expires_at < cutoff)
+                .limit(chunk_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not ids:
+                return total
+            session.execute(
+                insert(models.TicketArchive).from_select(
+                    _ARCHIVED_COLUMNS,
+                    select(*ticket_columns).where(models.Ticket.id.in_(ids), ~already_archived),
+                )
+            )
+            result = session.execute(delete(models.Ticket).where(models.Ticket.id.in_(ids)))
+            session.commit()
+        total += result.rowcount
+        if len(ids) < chunk_size:
+            return total
+
+
+def run_sweep(archive_after_seconds: int = TICKET_ARCHIVE_AFTER_SECONDS) -> None:
+    now = datetime.utcnow()
+    expired = expire_tickets(now)
+    archived = archive_tickets(now - timedelta(seconds=archive_after_seconds)) if archive_after_seconds > 0 else 0
+    purged = purge_verify_jobs()
+    attempts = purge_verify_attempts()
+    if expired or archived or purged or attempts:
+        logger.info(
+            "Sweep: %d ticket(s) expired, %d archived, %d verify job(s) and %d rate-limit row(s) purged",
+            expired,
+            archived,
+            purged,
+            attempts,
+        )
+
+
+def start_sweeper(interval: float = EXPIRY_SWEEP_INTERVAL) -> threading.Event:
+    """Run run_sweep every `interval` seconds on a daemon thread. Set the returned event to stop it."""
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval):
+            try:
+                run_sweep()
+            except Exception:
+                # e.g. the database is briefly unreachable; try again next interval
+                logger.exception("Expiry sweep failed")
+
+    threading.Thread(target=_loop, name="expiry-sweeper", daemon=True).start()
+    return stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive-after", type=int, default=TICKET_ARCHIVE_AFTER_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s - %(message)s")
+    run_sweep(args.archive_after)
@@ -0,0 +1,130 @@
+"""
+Signed ticket payloads carried in the stacked QR: building, parsing and
+verifying both the legacy pipe-separated text and the compact binary format
+(see payload_codec.py). No FastAPI/DB dependencies, so offline gates can
+verify with only this module and core_crypto.
+"""
+
+import os
+import time
+import uuid
+from hashlib import sha256
+from hmac import compare_digest, new as hmac_new
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from payload_codec import base45_decode, base45_encode, decode_varint, encode_varint
+
+# Same resolution as the API (database.py), also when imported on its own
+load_dotenv()
+
+DEV_SIGNING_SECRET = "dev-secret-change-me"
+SIGNING_SECRET = os.getenv("SIGNING_SECRET", DEV_SIGNING_SECRET).encode("utf-8")
+# True when running on the publicly known development key
+SIGNING_SECRET_IS_DEFAULT = SIGNING_SECRET == DEV_SIGNING_SECRET.encode("utf-8")
+COMPACT_PAYLOAD_VERSION = 2
+COMPACT_SIG_BYTES = 12
+
+
+def sign_payload(payload_str: str) -> str:
+    sig = hmac_new(SIGNING_SECRET, payload_str.encode("utf-8"), sha256).hexdigest()
+    return sig
+
+
+def build_legacy_payload(
+    name: str, email: str, user_uuid: str, check_in_code: str, expires_at: float
+) -> str:
+    payload = f"{name}|{email}|{user_uuid}|{check_in_code}|{int(expires_at)}"
+    sig = sign_payload(payload)
+    return f"{payload}|{sig}"
+
+
+def build_compact_payload(user_uuid: str, check_in_code: str, expires_at: float) -> str:
+    """
+    Compact payload (format 2): version byte, 16-byte UUID, check-in code as
+    uint32, varint expiry, then a truncated HMAC-SHA256, all base45-encoded so
+    the QR uses alphanumeric mode. Name/email stay server-side on the ticket row.
+    """
+    body = (
+        bytes([COMPACT_PAYLOAD_VERSION])
+        + uuid.UUID(user_uuid).bytes
+        + int(check_in_code).to_bytes(4, "big")
+        + encode_varint(int(expires_at))
+    )
+    sig = hmac_new(SIGNING_SECRET, body, sha256).digest()[:COMPACT_SIG_BYTES]
+    return base45_encode(body + sig)
+
+
+def parse_legacy_payload(payload: str) -> tuple[bool, Optional[str], Optional[dict]]:
+    parts = payload.split("|")
+    if len(parts) != 6:
+        return False, "Malformed payload", None
+    name, email, user_uuid, check_in_code, exp_str, sig = parts
+    try:
+        exp = int(exp_str)
+    except ValueError:
+        return False, "Invalid expiry", None
+
+    body = f"{name}|{email}|{user_uuid}|{check_in_code}|{exp}"
+    expected_sig = sign_payload(body)
+    if not compare_digest(expected_sig, sig):
+        return False, "Signature mismatch", None
+
+    parsed = {
+        "name": name,
+        "email": email,
+        "user_uuid": user_uuid,
+        "check_in_code": check_in_code,
+        "exp": exp,
+        "format": "legacy",
+    }
+    return True, None, parsed
+
+
+def parse_compact_payload(payload: str) -> tuple[bool, Optional[str], Optional[dict]]:
+    try:
+        raw = base45_decode(payload)
+    except ValueError:
+        return False, "Malformed payload", None
+    if len(raw) < 1 + 16 + 4 + 1 + COMPACT_SIG_BYTES or raw[0] != COMPACT_PAYLOAD_VERSION:
+        return False, "Malformed payload", None
+
+    body, sig = raw[:-COMPACT_SIG_BYTES], raw[-COMPACT_SIG_BYTES:]
+    try:
+        exp, end = decode_varint(body, 21)
+    except ValueError:
+        return False, "Invalid expiry", None
+    if end != len(body):
+        return False, "Malformed payload", None
+
+    expected_sig = hmac_new(SIGNING_SECRET, body, sha256).digest()[:COMPACT_SIG_BYTES]
+    if not compare_digest(expected_sig, sig):
+        return False, "Signature mismatch", None
+
+    parsed = {
+        "user_uuid": str(uuid.UUID(bytes=body[1:17])),
+        "check_in_code": f"{int.from_bytes(body[17:21], 'big'):08d}",
+        "exp": exp,
+        "format": "compact",
+    }
+    return True, None, parsed
+
+
+def verify_payload(payload: str, now: Optional[float] = None) -> tuple[bool, Optional[str], Optional[dict]]:
+    """
+    Accepts both the legacy pipe-separated payload and the compact format.
+    Expiry is checked against now (the scan time; defaults to the current time).
+    """
+    if "|" in payload:
+        ok, err, parsed = parse_legacy_payload(payload)
+    else:
+        ok, err, parsed = parse_compact_payload(payload)
+    if not ok:
+        return ok, err, parsed
+
+    if now is None:
+        now = time.time()
+    if parsed["exp"] < int(now):
+        return False, "Ticket expired (payload)", parsed
+    return True, None, parsed
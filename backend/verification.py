@@ -0,0 +1,258 @@
+"""
+Verification of one scan against the ticket database: image + payload checks,
+expiry, and the conditional redemption. Shared by the API (inline verify and
+batch) and verify_worker.py, so it imports no FastAPI code.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import or_
+
+import models
+from core_crypto import image_to_base64, stack_and_decode
+from database import get_session
+from ticket_payload import verify_payload
+
+
+class TicketVerifyResponse(BaseModel):
+    valid: bool
+    original_data: Optional[str] = None
+    debug_image: Optional[str] = None
+    aligned_share_a: Optional[str] = None
+    status: str
+    message: Optional[str] = None
+    decoded_payload: Optional[dict] = None
+    confidence: Optional[float] = 0.0
+
+
+def redeemable(model, ticket_id: int, redeemed_at: datetime) -> tuple:
+    """
+    Filter for the conditional redemption of a scan made at redeemed_at (naive
+    UTC): active rows, and rows the sweeper already expired if the scan
+    predates expires_at. model is Ticket or TicketArchive.
+    """
+    return (
+        model.id == ticket_id,
+        model.status.in_(("active", "expired")),
+        or_(model.expires_at.is_(None), model.expires_at >= redeemed_at),
+    )
+
+
+def redeem_ticket(ticket_id: int, redeemed_at_ts: float, model=models.Ticket) -> bool:
+    """
+    Mark a ticket redeemed by a scan made at redeemed_at_ts (see redeemable).
+    Returns False if the row no longer qualifies (someone else won).
+    """
+    redeemed_at = datetime.utcfromtimestamp(redeemed_at_ts)
+    with get_session() as session:
+        updated = (
+            session.query(model)
+            .filter(*redeemable(model, ticket_id, redeemed_at))
+            .update(
+                {"status": "redeemed", "redeemed_at": redeemed_at},
+                synchronize_session=False,
+            )
+        )
+        session.commit()
+    return updated == 1
+
+
+def expire_ticket(ticket_id: int) -> None:
+    with get_session() as session:
+        session.query(models.Ticket).filter(
+            models.Ticket.id == ticket_id, models.Ticket.status == "active"
+        ).update({"status": "expired"}, synchronize_session=False)
+        session.commit()
+
+
+def is_past_expiry(expires_at: Optional[datetime], now_ts: float) -> bool:
+    # expires_at is stored as naive UTC (see main.create_ticket)
+    return expires_at is not None and expires_at < datetime.utcfromtimestamp(now_ts)
+
+
+def expired_response() -> TicketVerifyResponse:
+    return TicketVerifyResponse(valid=False, status="expired", message="Ticket has expired")
+
+
+def _load_share_b_features(model, ticket_id: int) -> Optional[bytes]:
+    """Deferred column, fetched only when verify falls through to ORB."""
+    with get_session() as session:
+        return (
+            session.query(model.share_b_features)
+            .filter(model.id == ticket_id)
+            .scalar()
+        )
+
+
+def evaluate_share(
+    ticket, share_a_bytes: bytes, now_ts: float, include_debug_images: bool = False
+) -> TicketVerifyResponse:
+    """
+    Image + payload checks for one scan against a loaded Ticket (or
+    TicketArchive) row, without any DB writes. Expiry is judged at now_ts, the
+    scan time. valid=True means the scan is authentic and the ticket may be
+    redeemed; the caller applies the redemption.
+    """
+    share_b_bytes = ticket.share_b_blob
+    
+    # Default values
+    valid = False
+    message = "Verification failed"
+    decoded_payload = None
+    original_data = None
+    stacked_b64 = None
+    aligned_b64 = None
+    status = ticket.status
+
+    # 1. Stack Images + Decode QR
+    try:
+        decoded_data, stacked_img, aligned_img = stack_and_decode(
+            share_a_bytes, share_b_bytes, lambda: _load_share_b_features(type(ticket), ticket.id)
+        )
+        if include_debug_images:
+            stacked_b64 = image_to_base64(stacked_img)
+            aligned_b64 = image_to_base64(aligned_img)
+    except Exception as exc:
+        return TicketVerifyResponse(
+            valid=False,
+            status=status,
+            message=f"Image alignment failed: {str(exc)}",
+            debug_image=None,
+            aligned_share_a=None
+        )
+
+    original_data = decoded_data
+
+    if not decoded_data:
+        return TicketVerifyResponse(
+            valid=False,
+            status=status,
+            message="Could not decode QR code from stacked image",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64
+        )
+
+    # 2. Verify Payload Signature
+    sig_ok, err_msg, parsed = verify_payload(decoded_data, now_ts)
+    decoded_payload = parsed
+    
+    if not sig_ok:
+        return TicketVerifyResponse(
+            valid=False,
+            status=status,
+            message=f"Invalid signature: {err_msg}",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64,
+            original_data=original_data,
+            decoded_payload=decoded_payload
+        )
+
+    if parsed and parsed["check_in_code"] != ticket.check_in_code:
+        return TicketVerifyResponse(
+            valid=False,
+            status=status,
+            message="Check-in code mismatch in payload",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64,
+            original_data=original_data,
+            decoded_payload=decoded_payload
+        )
+
+    if parsed and parsed["user_uuid"] != ticket.user_uuid:
+        return TicketVerifyResponse(
+            valid=False,
+            status=status,
+            message="UUID mismatch in payload",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64,
+            original_data=original_data,
+            decoded_payload=decoded_payload
+        )
+
+    # Compact payloads don't carry personal data; fill it in from the ticket row
+    if parsed and parsed["format"] == "compact":
+        parsed["name"] = ticket.holder_name
+        parsed["email"] = ticket.holder_email
+
+    # 3. Check Ticket Status (Redeemed/Expired)
+    if ticket.status == "redeemed":
+        return TicketVerifyResponse(
+            valid=False,
+            status="redeemed",
+            message="Ticket has already been redeemed",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64,
+            original_data=original_data,
+            decoded_payload=decoded_payload
+        )
+
+    if is_past_expiry(ticket.expires_at, now_ts):
+        return TicketVerifyResponse(
+            valid=False,
+            status="expired",
+            message="Ticket has expired",
+            debug_image=stacked_b64,
+            aligned_share_a=aligned_b64,
+            original_data=original_data,
+            decoded_payload=decoded_payload
+        )
+
+    # 4. Success (pending redemption)
+    return TicketVerifyResponse(
+        valid=True,
+        original_data=decoded_data,
+        debug_image=stacked_b64,
+        aligned_share_a=aligned_b64,
+        status="redeemed",
+        message="Ticket is valid and authentic",
+        decoded_payload=decoded_payload,
+        confidence=1.0
+    )
+
+
+def run_verification(
+    check_in_code: str, share_a_bytes: bytes, now_ts: float, include_debug_images: bool = False
+) -> TicketVerifyResponse:
+    """Full verify for one scan: load the ticket, evaluate the share, apply redemption/expiry."""
+    with get_session() as session:
+        ticket = (
+            session.query(models.Ticket)
+            .filter(models.Ticket.check_in_code == check_in_code)
+            .one_or_none()
+        )
+    if ticket is None:
+        return TicketVerifyResponse(valid=False, status="not_found", message="Ticket not found")
+
+    # Expired tickets are rejected before any image work. Expiry is judged at
+    # the scan time, so a queued scan submitted before expiry still counts if
+    # the sweeper expired the ticket meanwhile.
+    if ticket.status != "redeemed" and is_past_expiry(ticket.expires_at, now_ts):
+        if ticket.status == "active":
+            expire_ticket(ticket.id)
+        return expired_response()
+
+    result = evaluate_share(ticket, share_a_bytes, now_ts, include_debug_images)
+    if result.valid and not redeem_ticket(ticket.id, now_ts):
+        # Lost the race against a concurrent scan of the same ticket
+        result = result.model_copy(
+            update={"valid": False, "message": "Ticket has already been redeemed", "confidence": 0.0}
+        )
+    return result
+
+
+def find_archived_ticket(session, check_in_code: str) -> Optional[TicketVerifyResponse]:
+    """Status-only answer for a ticket the sweeper has moved to tickets_archive."""
+    status = (
+        session.query(models.TicketArchive.status)
+        .filter(models.TicketArchive.check_in_code == check_in_code)
+        .order_by(models.TicketArchive.id.desc())
+        .limit(1)
+        .scalar()
+    )
+    if status is None:
+        return None
+    if status == "expired":
+        return expired_response()
+    return TicketVerifyResponse(valid=False, status=status, message="Ticket has already been redeemed")
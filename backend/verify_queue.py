@@ -0,0 +1,146 @@
+"""
+DB-backed job queue between stateless API processes and the verify worker
+pool. Uses the regular ticket database (Postgres or SQLite), so no external
+broker is needed.
+
+Jobs are claimed with a conditional UPDATE (status must still be claimable),
+which is atomic on both backends: when two workers race for the same row only
+one update matches. A job whose worker died is reclaimed after
+VERIFY_JOB_LEASE_SECONDS; that is safe because redemption itself is
+idempotent (see verification.redeem_ticket).
+
+An API request that gives up waiting cancels its job if no worker has
+claimed it yet. Rows nobody will pop (results of abandoned requests, jobs
+enqueued by a process that died) are purged after
+VERIFY_JOB_RETENTION_SECONDS by purge_verify_jobs, which the expiry sweeper
+runs.
+"""
+
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import and_, delete, or_, select
+
+import models
+from database import get_session
+
+# Seconds between result polls (API processes) and between claims (idle workers)
+VERIFY_POLL_INTERVAL = float(os.getenv("VERIFY_POLL_INTERVAL", "0.05"))
+VERIFY_JOB_LEASE_SECONDS = float(os.getenv("VERIFY_JOB_LEASE_SECONDS", "60"))
+VERIFY_JOB_RETENTION_SECONDS = float(os.getenv("VERIFY_JOB_RETENTION_SECONDS", "600"))
+_CLAIM_ATTEMPTS = 5
+
+
+def enqueue_verify_job(
+    check_in_code: str, share_a_bytes: bytes, submitted_at: float, include_debug_images: bool = False
+) -> int:
+    with get_session() as session:
+        job = models.VerifyJob(
+            check_in_code=check_in_code,
+            share_a_blob=share_a_bytes,
+            submitted_at=submitted_at,
+            include_debug_images=include_debug_images,
+            status="pending",
+        )
+        session.add(job)
+        session.commit()
+        return job.id
+
+
+def _claimable(now_ts: float):
+    return or_(
+        models.VerifyJob.status == "pending",
+        and_(
+            models.VerifyJob.status == "running",
+            models.VerifyJob.claimed_at < now_ts - VERIFY_JOB_LEASE_SECONDS,
+        ),
+    )
+
+
+def claim_verify_job(worker_id: str) -> Optional[models.VerifyJob]:
+    """Claim the oldest claimable job for worker_id, or return None if the queue is empty."""
+    with get_session() as session:
+        for _ in range(_CLAIM_ATTEMPTS):
+            now_ts = time.time()
+            job_id = (
+                session.query(models.VerifyJob.id)
+                .filter(_claimable(now_ts))
+                .order_by(models.VerifyJob.id)
+                .limit(1)
+                .scalar()
+            )
+            if job_id is None:
+                return None
+
+            claimed = (
+                session.query(models.VerifyJob)
+                .filter(models.VerifyJob.id == job_id, _claimable(now_ts))
+                .update(
+                    {"status": "running", "worker_id": worker_id, "claimed_at": now_ts},
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            if claimed:
+                return session.get(models.VerifyJob, job_id)
+            # Another worker won this row; try the next one.
+    return None
+
+
+def complete_verify_job(job_id: int, result_json: str, failed: bool = False) -> None:
+    with get_session() as session:
+        session.query(models.VerifyJob).filter(models.VerifyJob.id == job_id).update(
+            {
+                "status": "failed" if failed else "done",
+                "result_json": result_json,
+                "finished_at": time.time(),
+                # Share A is no longer needed once the result exists
+                "share_a_blob": b"",
+            },
+            synchronize_session=False,
+        )
+        session.commit()
+
+
+def pop_verify_job_result(job_id: int) -> Optional[str]:
+    """Return the finished job's result JSON and delete the job, or None if it isn't finished yet."""
+    with get_session() as session:
+        # Polled every VERIFY_POLL_INTERVAL; never load share_a_blob here
+        row = session.execute(
+            select(models.VerifyJob.status, models.VerifyJob.result_json).where(models.VerifyJob.id == job_id)
+        ).first()
+        if row is None or row.status not in ("done", "failed"):
+            return None
+        session.execute(delete(models.VerifyJob).where(models.VerifyJob.id == job_id))
+        session.commit()
+        return row.result_json
+
+
+def cancel_verify_job(job_id: int) -> bool:
+    """Delete the job if no worker has claimed it yet. False means a worker has (or had) it."""
+    with get_session() as session:
+        result = session.execute(
+            delete(models.VerifyJob).where(models.VerifyJob.id == job_id, models.VerifyJob.status == "pending")
+        )
+        session.commit()
+        return result.rowcount > 0
+
+
+def purge_verify_jobs(now_ts: Optional[float] = None, retention: float = VERIFY_JOB_RETENTION_SECONDS) -> int:
+    """
+    Delete finished jobs whose result was never popped and pending jobs nobody
+    is waiting for any more, older than retention seconds. Returns rows deleted.
+    """
+    cutoff = (now_ts or time.time()) - retention
+    with get_session() as session:
+        result = session.execute(
+            delete(models.VerifyJob).where(
+                or_(
+                    and_(models.VerifyJob.status.in_(("done", "failed")), models.VerifyJob.finished_at < cutoff),
+                    and_(models.VerifyJob.status == "pending", models.VerifyJob.submitted_at < cutoff),
+                )
+            )
+        )
+        session.commit()
+        return result.rowcount
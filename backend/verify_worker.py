@@ -0,0 +1,84 @@
+"""
+Verify worker pool: consumes jobs enqueued by API processes running with
+VERIFY_MODE=queue and writes the verification result back to the job row.
+
+Run:
+  uv run python verify_worker.py --workers 4
+
+Workers share nothing but the database, so they can run on any number of
+hosts pointed at the same DATABASE_URL.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import time
+
+from core_crypto import warm_up
+from verification import TicketVerifyResponse, run_verification
+from verify_queue import VERIFY_POLL_INTERVAL, claim_verify_job, complete_verify_job
+
+logger = logging.getLogger("verify_worker")
+
+
+def run_worker(worker_id: str, poll_interval: float = VERIFY_POLL_INTERVAL, stop_when_idle: bool = False) -> int:
+    """Process jobs until interrupted (or until the queue is empty with stop_when_idle). Returns jobs handled."""
+    warm_up()
+    handled = 0
+    while True:
+        try:
+            job = claim_verify_job(worker_id)
+        except Exception:
+            # e.g. tables not migrated yet on first boot; keep polling
+            logger.exception("Worker %s could not claim a job", worker_id)
+            time.sleep(max(poll_interval, 1.0))
+            continue
+
+        if job is None:
+            if stop_when_idle:
+                return handled
+            time.sleep(poll_interval)
+            continue
+
+        try:
+            result = run_verification(
+                job.check_in_code, job.share_a_blob, job.submitted_at, job.include_debug_images
+            )
+            complete_verify_job(job.id, result.model_dump_json())
+        except Exception as exc:
+            logger.exception("Worker %s failed job %s", worker_id, job.id)
+            error = TicketVerifyResponse(valid=False, status="error", message=f"Verify worker error: {exc}")
+            complete_verify_job(job.id, error.model_dump_json(), failed=True)
+        handled += 1
+
+
+def _worker_main(index: int) -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s - %(message)s",
+    )
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    logger.info("Verify worker %s started", worker_id)
+    try:
+        run_worker(worker_id)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=_worker_main, args=(i,), daemon=True) for i in range(args.workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
@@ -31,6 +31,8 @@ const VerifyPage = () => {
     setVerifying(true);
     const form = new FormData();
     form.append("file", verifyFile);
+    // This page shows the stacked/aligned images; the API only renders them on request
+    form.append("debug", "true");
     try {
       const res = await axios.post(`${API_BASE}/api/tickets/verify`, form, {
         headers: { "Content-Type": "multipart/form-data" },
@@ -65,7 +67,7 @@ const VerifyPage = () => {
           >
             <input
               type="file"
-              accept="image/*"
+              accept="image/png,image/jpeg"
               className="hidden"
               ref={fileInputRef}
               onChange={(e) => {